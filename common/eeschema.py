@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+"""
+Helpers for the legacy EESchema file formats (.lib, .dcm and .sch)
+"""
+
+import re
+
+# a quoted field (token ends after the closing quote), a lone quote which is
+# never closed or a run of non whitespace characters (quotes included)
+_token_re = re.compile(r'"[^"]*"|"|[^ \t\r\n]+')
+
+def splitLine(line):
+    """
+    Split a line in its fields, quoted fields keep their quotes.
+
+    The result is the same as the list of tokens of shlex.shlex(line) with
+    whitespace_split = True, commenters = '' and quotes = '"' (non posix),
+    which was used before, but without the character by character state
+    machine of shlex.
+    """
+    tokens = _token_re.findall(line)
+
+    if '"' in tokens:
+        raise ValueError("No closing quotation")
+
+    return tokens
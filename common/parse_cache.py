@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import hashlib
+import io
+import marshal
+import os
+import sqlite3
+import time
+import zlib
+
+import sexpr
+
+# version of the stored data, entries written in another format are ignored
+FORMAT = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime INTEGER,
+    sha1 TEXT
+);
+CREATE TABLE IF NOT EXISTS trees (
+    sha1 TEXT PRIMARY KEY,
+    format INTEGER,
+    size INTEGER,
+    used REAL,
+    data BLOB
+);
+'''
+
+def defaultPath():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'kicad-library-utils', 'parse_cache.sqlite')
+
+# nested lists of SexprNode (or any list subclass) to plain lists for marshal
+def _plain(data):
+    return [_plain(item) if isinstance(item, list) else item for item in data]
+
+def _node(data, node):
+    return node([_node(item, node) if type(item) is list else item for item in data])
+
+class ParseCache(object):
+    """
+    On-disk cache of parsed s-expression files.
+
+    The parsed data is stored by the sha1 of the file content, so renamed or
+    checked out again files are still found. The size and mtime of each path
+    are recorded too, an unchanged file is then not read at all.
+
+    Entries not used for max_age days are removed when the cache is closed
+    (at exit), then the least recently used ones until the stored data is
+    below max_size MB. If the cache can not be opened or written, the files
+    are simply parsed.
+    """
+    def __init__(self, path=None, max_age=30, max_size=256):
+        self.path = path if path else defaultPath()
+        self.max_age = max_age * 24 * 3600
+        self.max_size = max_size * 1024 * 1024
+        self.enabled = True
+        self._db = None
+        self._pid = None
+
+    def _open(self):
+        # a connection must not be shared with a forked process
+        if self._db is not None and self._pid != os.getpid():
+            self._db = None
+
+        if self._db is None and self.enabled:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+
+                db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+                db.execute('PRAGMA journal_mode = WAL')
+                # it's only a cache, a lost write just means parsing again
+                db.execute('PRAGMA synchronous = OFF')
+                db.executescript(SCHEMA)
+            except (OSError, sqlite3.Error):
+                self.enabled = False
+            else:
+                if self._pid is None:
+                    atexit.register(self.close)
+                self._db = db
+                self._pid = os.getpid()
+
+        return self._db
+
+    def parse(self, filename, node=list):
+        """
+        Return the parsed content of filename, same as
+        sexpr.parse_stream(open(filename), node=node)
+        """
+        db = self._open()
+        if db is not None:
+            try:
+                return self._parse(db, filename, node)
+            except sqlite3.Error:
+                self.enabled = False
+                self._db = None
+
+        with open(filename) as f:
+            return sexpr.parse_stream(f, node=node)
+
+    def _parse(self, db, filename, node):
+        path = os.path.abspath(filename)
+        st = os.stat(path)
+        raw = None
+
+        row = db.execute('SELECT size, mtime, sha1 FROM files WHERE path = ?', (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            sha1 = row[2]
+        else:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            sha1 = hashlib.sha1(raw).hexdigest()
+            db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                       (path, st.st_size, st.st_mtime_ns, sha1))
+
+        now = time.time()
+
+        row = db.execute('SELECT used, data FROM trees WHERE sha1 = ? AND format = ?', (sha1, FORMAT)).fetchone()
+        if row:
+            # an hourly resolution is plenty for an age counted in days
+            if now - row[0] > 3600:
+                db.execute('UPDATE trees SET used = ? WHERE sha1 = ?', (now, sha1))
+            return _node(marshal.loads(zlib.decompress(row[1])), node)
+
+        if raw is None:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            # the file may have changed without a new size or mtime
+            content_sha1 = hashlib.sha1(raw).hexdigest()
+            if content_sha1 != sha1:
+                sha1 = content_sha1
+                db.execute('UPDATE files SET sha1 = ? WHERE path = ?', (sha1, path))
+
+        # parse the content which was hashed, decoded as open() would do
+        data = sexpr.parse_stream(io.TextIOWrapper(io.BytesIO(raw)), node=node)
+
+        blob = zlib.compress(marshal.dumps(_plain(data)), 1)
+        db.execute('INSERT OR REPLACE INTO trees VALUES (?, ?, ?, ?, ?)',
+                   (sha1, FORMAT, len(blob), now, blob))
+
+        return data
+
+    def evict(self):
+        """
+        Remove the entries older than max_age and the least recently used
+        ones above max_size
+        """
+        db = self._open()
+        if db is None:
+            return
+
+        try:
+            db.execute('DELETE FROM trees WHERE used < ? OR format != ?', (time.time() - self.max_age, FORMAT))
+
+            total = 0
+            old = []
+            for sha1, size in db.execute('SELECT sha1, size FROM trees ORDER BY used DESC'):
+                total += size
+                if total > self.max_size:
+                    old.append((sha1,))
+            db.executemany('DELETE FROM trees WHERE sha1 = ?', old)
+
+            db.execute('DELETE FROM files WHERE sha1 NOT IN (SELECT sha1 FROM trees)')
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        if self._db is not None and self._pid == os.getpid():
+            self.evict()
+            self._db.close()
+        self._db = None
@@ -10,36 +10,63 @@ def logError(log_file, rule_name, lib_name, item_name, warning=False):
     of the errors and the library items that do not comply.
     """
 
-    if not log_file.endswith('.json'):
-        log_file += '.json'
+    log = ErrorLog(log_file)
+    log.add(rule_name, lib_name, item_name, warning)
+    log.write()
 
-    if os.path.exists(log_file) and os.path.isfile(log_file):
-        with open(log_file, 'r') as json_file:
-            try:
-                log_data = json.loads(json_file.read())
-            except:
-                print("Found bad JSON data - clearing")
-                log_data = {}
+class ErrorLog(object):
+    """
+    Collect KLC error output in memory and write it to a json file at once.
+    The file has the same format as with logError, entries are appended to
+    the ones already logged in the file.
+    """
+
+    def __init__(self, log_file):
+        if not log_file.endswith('.json'):
+            log_file += '.json'
+
+        self.log_file = log_file
+        self.log_data = {}
+
+    def add(self, rule_name, lib_name, item_name, warning=False):
+        key = 'warnings' if warning else 'errors'
 
-    else:
-        log_data = {}
+        log_entry = {'library': lib_name, 'item': item_name}
 
-    key = 'warnings' if warning else 'errors'
+        self.log_data.setdefault(key, {}).setdefault(rule_name, []).append(log_entry)
+
+    def write(self):
+        if not self.log_data:
+            return
+
+        if os.path.exists(self.log_file) and os.path.isfile(self.log_file):
+            with open(self.log_file, 'r') as json_file:
+                try:
+                    log_data = json.loads(json_file.read())
+                except:
+                    print("Found bad JSON data - clearing")
+                    log_data = {}
+
+        else:
+            log_data = {}
 
-    if not key in log_data:
-        log_data[key] = {}
+        # merge the new entries after the logged ones
+        for key, rules in self.log_data.items():
+            if not key in log_data:
+                log_data[key] = {}
 
-    log_entry = {'library': lib_name, 'item': item_name}
+            for rule_name, entries in rules.items():
+                if not rule_name in log_data[key]:
+                    log_data[key][rule_name] = []
 
-    if not rule_name in log_data[key]:
-        log_data[key][rule_name] = []
+                log_data[key][rule_name].extend(entries)
 
-    log_data[key][rule_name].append(log_entry)
+        # Write the log data back to file
+        with open(self.log_file, 'w') as json_file:
+            op = json.dumps(log_data, indent=4, sort_keys=True, separators=(',', ':'))
+            json_file.write(op)
 
-    # Write the log data back to file
-    with open(log_file, 'w') as json_file:
-        op = json.dumps(log_data, indent=4, sort_keys=True, separators=(',', ':'))
-        json_file.write(op)
+        self.log_data = {}
 
 # Static functions
 def isValidName(name, checkForGraphicSymbol=False, checkForPowerSymbol=False):
@@ -3,6 +3,7 @@
 
 from __future__ import print_function
 import re
+import sys
 
 dbg = False
 float_render = "%.2f"
@@ -42,24 +43,265 @@ def parse_sexp(sexp):
             raise NotImplementedError("Error: %r" % (term, value))
     assert not stack, "Trouble with nesting of brackets"
     return out[0]
-    
+
+# Events generated by iterparse
+START = 'start'
+ATOM = 'atom'
+END = 'end'
+
+class SexprNode(list):
+    """
+    A parsed S-expression list.
+
+    Child lists are indexed by their first element (head) the first time
+    they are looked up, so finding e.g. all the pads of a module is a
+    dictionary access instead of a scan. Any change to the list drops the
+    index, it is rebuilt on the next lookup.
+    """
+    __slots__ = ('_index',)
+
+    def children(self, head):
+        """
+        Return the child lists whose first element is head, in order
+        """
+        try:
+            index = self._index
+        except AttributeError:
+            index = None
+
+        if index is None:
+            index = {}
+            for item in self:
+                if isinstance(item, list) and item and not isinstance(item[0], list):
+                    index.setdefault(item[0], []).append(item)
+            self._index = index
+
+        return list(index.get(head, ()))
+
+    def find(self, head, max_level=None):
+        """
+        Return the lists of this subtree (including itself) whose first
+        element is head, in document order.
+        max_level limits the depth: 1 = this list only, 2 = this list and
+        its children, ... (None = no limit)
+        """
+        result = []
+        if max_level is None or max_level > 0:
+            self._find(head, result, 1, max_level)
+        return result
+
+    def _find(self, head, result, level, max_level):
+        if self and self[0] == head:
+            result.append(self)
+
+        if max_level is None or level + 1 < max_level:
+            for item in self:
+                if isinstance(item, SexprNode):
+                    item._find(head, result, level + 1, max_level)
+        elif level + 1 == max_level:
+            result.extend(self.children(head))
+
+def _dropIndex(method):
+    def wrapper(self, *args, **kwargs):
+        self._index = None
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+for _name in ['__setitem__', '__delitem__', '__iadd__', '__imul__', 'append',
+              'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse']:
+    setattr(SexprNode, _name, _dropIndex(getattr(list, _name)))
+
+_term_re = re.compile(term_regex)
+
+def iterparse(fileobj, bufsize=65536):
+    """
+    Stream an S-expression from a file object.
+
+    Yields (event, value) tuples where event is START, ATOM or END.
+    value is the converted atom for ATOM events (same conversion as
+    parse_sexp, unquoted symbols are interned) and None otherwise.
+    The file is read in chunks of bufsize characters, so it never has to be
+    held in memory as a whole.
+    """
+    search = _term_re.search
+    intern = sys.intern
+    buf = ''
+    eof = False
+
+    while not eof:
+        chunk = fileobj.read(bufsize)
+        eof = not chunk
+        buf += chunk
+
+        pos = 0
+        size = len(buf)
+
+        while True:
+            m = search(buf, pos)
+            if m is None:
+                pos = size
+                break
+
+            term = m.lastgroup
+            value = m.group(term)
+
+            # A token touching the end of the buffer may continue in the next
+            # chunk, so does a quoted string which is not terminated yet
+            # (it is matched as a plain symbol) or which may only be closed
+            # by an escaped quote so far
+            if not eof and (m.end() == size or
+                            (term == 's' and value[0] == '"') or
+                            (term == 'sq' and value[-2] == '\\')):
+                pos = m.start()
+                break
+
+            pos = m.end()
+
+            if term == 'brackl':
+                yield START, None
+            elif term == 'brackr':
+                yield END, None
+            elif term == 'num':
+                v = float(value)
+                if v.is_integer(): v = int(v)
+                yield ATOM, v
+            elif term == 'sq':
+                yield ATOM, value[1:-1].replace(r'\"', '"')
+            else:
+                yield ATOM, intern(value)
+
+        buf = buf[pos:]
+
+def parse_stream(fileobj, bufsize=65536, node=list):
+    """
+    Build the nested list structure from the events of iterparse.
+    The result is identical to parse_sexp(fileobj.read()), node can be set
+    to a list subclass (e.g. SexprNode) to be used for all lists.
+    """
+    append = list.append
+    stack = []
+    out = node()
+    for event, value in iterparse(fileobj, bufsize):
+        if event is ATOM:
+            append(out, value)
+        elif event is START:
+            stack.append(out)
+            out = node()
+        else:
+            assert stack, "Trouble with nesting of brackets"
+            tmpout, out = out, stack.pop(-1)
+            append(out, tmpout)
+    assert not stack, "Trouble with nesting of brackets"
+    return out[0]
+
+def parse_partial(fileobj, keys, bufsize=65536, node=list, single=()):
+    """
+    Build only a part of the top level list of an S-expression.
+
+    All top level atoms are kept, but of the child lists only those whose
+    first element is in keys are built. The others are skipped without
+    creating any list. single are the keys which can only appear once: if
+    all the keys are in single, parsing stops at the first unwanted child
+    once every key has been found, so the rest of the file is never
+    tokenized. Otherwise the whole file is read, as a key could repeat.
+    """
+    append = list.append
+    keys = set(keys)
+    found = set()
+    # keys still to be found before parsing can stop, None if it can not
+    stop = keys if keys.issubset(single) else None
+    top = node()
+    events = iterparse(fileobj, bufsize)
+
+    # opening bracket of the top level list
+    for event, value in events:
+        if event is START:
+            break
+
+    for event, value in events:
+        if event is ATOM:
+            append(top, value)
+            continue
+        if event is END:
+            break
+
+        # child list, its first element decides if it has to be built
+        event, value = next(events)
+
+        if event is ATOM and value in keys:
+            found.add(value)
+            stack = []
+            out = node()
+            append(out, value)
+            for event, value in events:
+                if event is ATOM:
+                    append(out, value)
+                elif event is START:
+                    stack.append(out)
+                    out = node()
+                elif stack:
+                    tmpout, out = out, stack.pop(-1)
+                    append(out, tmpout)
+                else:
+                    break
+            append(top, out)
+            continue
+
+        if found == stop:
+            break
+
+        # skip the whole subtree
+        depth = 0 if event is END else 2 if event is START else 1
+        while depth:
+            event, value = next(events)
+            if event is START:
+                depth += 1
+            elif event is END:
+                depth -= 1
+
+    return top
+
+# rendering of the string atoms, most of them (layer names, keywords, ...)
+# are repeated all over a file
+_string_items = {}
+_quote_re = re.compile(r'[\s()\"]')
+
+def _stringItem(val):
+    try:
+        return _string_items[val]
+    except KeyError:
+        pass
+
+    if len(val) == 0:
+        item = '""'
+    elif _quote_re.search(val):
+        item = '"%s"' % repr(val)[1:-1].replace('"', '\"')
+    else:
+        item = val
+
+    # keep the cache small, long runs over many files would fill it with
+    # descriptions and tags
+    if len(_string_items) >= 4096:
+        _string_items.clear()
+    _string_items[val] = item
+
+    return item
+
 # Form a valid sexpr (single line)
 def SexprItem(val, key=None):
-    if key:
-        fmt = "(" + key + " {val})"
-    else:
-        fmt = "{val}"
-    
     t = type(val)
-    
-    if val is None or t == str and len(val) == 0:
+
+    if val is None:
         val = '""'
+    elif t == str:
+        val = _stringItem(val)
     elif t in [list, tuple]:
         val = ' '.join([SexprItem(v) for v in val])
     elif t == dict:
         values = []
-        for key in val.keys():
-            values.append(SexprItem(val[key],key))
+        for k in val.keys():
+            values.append(SexprItem(val[k], k))
         val = ' '.join(values)
     elif t == float:
         val = str(round(val,10)).rstrip('0').rstrip('.')
@@ -67,29 +309,46 @@ def SexprItem(val, key=None):
         val = str(val)
     #elif t == float:
     #    val = float_render % val
-    elif t == str and re.search(r'[\s()\"]', val):
-        val = '"%s"' % repr(val)[1:-1].replace('"', '\"') 
-    
-    return fmt.format(val=val)
-    
+    else:
+        val = format(val)
+
+    if key:
+        return "(" + key + " " + val + ")"
+    return val
+
 class SexprBuilder(object):
-    def __init__(self, key):
+    """
+    Build a formatted S-expression.
+
+    The text is collected as a list of chunks which are joined once when
+    output is read, or written straight to the file object out if one is
+    given (output is then empty).
+    """
+    def __init__(self, key, out=None):
         self.indent = 0
-        self.output = ''
         self.items = []
+        self._chunks = []
+        self._write = self._chunks.append if out is None else out.write
         if key is not None:
             self.startGroup(key, newline=False)
-       
+
+    @property
+    def output(self):
+        if len(self._chunks) > 1:
+            self._chunks[:] = [''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else ''
+
     def _indent(self):
-        self.output += ' ' * 2 * self.indent
-   
+        self._write(' ' * 2 * self.indent)
+
     def _newline(self):
-        self.output += '\n'
-        
+        self._write('\n')
+
     def _addItems(self):
-        self.output += ' '.join(map(str,self.items))
-        self.items = []
-       
+        if self.items:
+            self._write(' '.join(map(str,self.items)))
+            self.items = []
+
     def startGroup(self, key=None, newline=True, indent=False):
         self._addItems()
         if newline and indent:
@@ -97,10 +356,10 @@ class SexprBuilder(object):
         if newline:
             self._newline()
             self._indent()
-        self.output += '('
+        self._write('(')
         if key:
-            self.output += str(key) + ' '
-            
+            self._write(str(key) + ' ')
+
     def endGroup(self, newline=True):
         self._addItems()
         if newline:
@@ -108,8 +367,8 @@ class SexprBuilder(object):
             if self.indent > 0:
                 self.indent -= 1
             self._indent()
-        self.output += ')'
-        
+        self._write(')')
+
     def addOptItem(self, key, item, newline=True, indent=False):
         if item in [None, 0, False]:
             return
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the on-disk cache of parsed files
+
+example of use: python -m unittest test_parse_cache
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import parse_cache
+import sexpr
+from parse_cache import ParseCache
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ParseCache(os.path.join(self.dir, 'cache', 'parse_cache.sqlite'))
+
+        # count the files really parsed
+        self.parsed = 0
+        parse_stream = sexpr.parse_stream
+        def counting_parse_stream(*args, **kwargs):
+            self.parsed += 1
+            return parse_stream(*args, **kwargs)
+        parse_cache.sexpr.parse_stream = counting_parse_stream
+        self.addCleanup(setattr, parse_cache.sexpr, 'parse_stream', parse_stream)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content, mtime=None):
+        filename = os.path.join(self.dir, name)
+        with open(filename, 'w') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(filename, (mtime, mtime))
+        return filename
+
+    def trees(self):
+        return [row[0] for row in self.cache._open().execute('SELECT sha1 FROM trees')]
+
+    def test_miss_then_hit(self):
+        filename = self.write('a.kicad_mod', '(module a (layer F.Cu))')
+
+        self.assertEqual(self.cache.parse(filename), ['module', 'a', ['layer', 'F.Cu']])
+        self.assertEqual(self.parsed, 1)
+
+        self.assertEqual(self.cache.parse(filename), ['module', 'a', ['layer', 'F.Cu']])
+        self.assertEqual(self.parsed, 1)
+
+    def test_node_type(self):
+        filename = self.write('a.kicad_mod', '(module a (layer F.Cu))')
+        self.cache.parse(filename)
+
+        data = self.cache.parse(filename, node=sexpr.SexprNode)
+        self.assertIsInstance(data, sexpr.SexprNode)
+        self.assertIsInstance(data[2], sexpr.SexprNode)
+
+    def test_same_content_other_path(self):
+        a = self.write('a.kicad_mod', '(module a (layer F.Cu))')
+        b = self.write('b.kicad_mod', '(module a (layer F.Cu))')
+
+        self.cache.parse(a)
+        self.assertEqual(self.cache.parse(b), ['module', 'a', ['layer', 'F.Cu']])
+        self.assertEqual(self.parsed, 1)
+
+    def test_size_change(self):
+        filename = self.write('a.kicad_mod', '(module a (layer F.Cu))', mtime=1000000)
+        self.cache.parse(filename)
+
+        self.write('a.kicad_mod', '(module a (layer B.Cu) (attr smd))', mtime=1000000)
+        self.assertEqual(self.cache.parse(filename), ['module', 'a', ['layer', 'B.Cu'], ['attr', 'smd']])
+        self.assertEqual(self.parsed, 2)
+
+    def test_mtime_change(self):
+        filename = self.write('a.kicad_mod', '(module a (layer F.Cu))', mtime=1000000)
+        self.cache.parse(filename)
+
+        # same size
+        self.write('a.kicad_mod', '(module a (layer B.Cu))', mtime=2000000)
+        self.assertEqual(self.cache.parse(filename), ['module', 'a', ['layer', 'B.Cu']])
+        self.assertEqual(self.parsed, 2)
+
+    def test_eviction_by_age(self):
+        a = self.write('a.kicad_mod', '(module a (layer F.Cu))')
+        b = self.write('b.kicad_mod', '(module b (layer F.Cu))')
+        self.cache.parse(a)
+        self.cache.parse(b)
+
+        db = self.cache._open()
+        old = time.time() - self.cache.max_age - 3600
+        db.execute('UPDATE trees SET used = ? WHERE sha1 = (SELECT sha1 FROM files WHERE path = ?)', (old, os.path.abspath(a)))
+
+        self.cache.evict()
+        self.assertEqual(len(self.trees()), 1)
+
+        self.cache.parse(b)
+        self.assertEqual(self.parsed, 2)
+        self.cache.parse(a)
+        self.assertEqual(self.parsed, 3)
+
+    def test_eviction_by_size(self):
+        names = ['a', 'b', 'c']
+        filenames = [self.write(name + '.kicad_mod', '(module {n} (layer F.Cu))'.format(n=name)) for name in names]
+        for i, filename in enumerate(filenames):
+            self.cache.parse(filename)
+            # a, then b, then c were used last
+            self.cache._open().execute('UPDATE trees SET used = ? WHERE sha1 = (SELECT sha1 FROM files WHERE path = ?)',
+                                       (time.time() - 100 + i, os.path.abspath(filename)))
+
+        sizes = [row[0] for row in self.cache._open().execute('SELECT size FROM trees')]
+        # room for two entries
+        self.cache.max_size = sum(sizes) - min(sizes)
+
+        self.cache.evict()
+        self.assertEqual(len(self.trees()), 2)
+
+        # the least recently used one was removed
+        self.cache.parse(filenames[2])
+        self.cache.parse(filenames[1])
+        self.assertEqual(self.parsed, 3)
+        self.cache.parse(filenames[0])
+        self.assertEqual(self.parsed, 4)
+
+    def test_unusable_cache(self):
+        # the cache directory can not be created, the file is still parsed
+        blocker = self.write('blocker', '')
+        cache = ParseCache(os.path.join(blocker, 'parse_cache.sqlite'))
+        filename = self.write('a.kicad_mod', '(module a (layer F.Cu))')
+
+        self.assertEqual(cache.parse(filename), ['module', 'a', ['layer', 'F.Cu']])
+        self.assertFalse(cache.enabled)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the partial S-expression parser
+
+example of use: python -m unittest test_sexpr
+"""
+
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sexpr
+
+# elements of the same type are interleaved with other elements
+FOOTPRINT = """(module Test (layer F.Cu) (tedit 5A02FF57)
+  (descr "test footprint")
+  (fp_text reference REF** (at 0 -2) (layer F.SilkS))
+  (fp_line (start 0 0) (end 1 0) (layer F.SilkS) (width 0.12))
+  (fp_text value Test (at 0 2) (layer F.Fab))
+  (fp_line (start 1 0) (end 1 1) (layer F.SilkS) (width 0.12))
+  (fp_text user %R (at 0 0) (layer F.Fab))
+  (model a.wrl (at (xyz 0 0 0)))
+  (pad 1 smd rect (at 0 0) (size 1 1) (layers F.Cu))
+  (model b.wrl (at (xyz 0 0 0)))
+)
+"""
+
+class ParsePartialTest(unittest.TestCase):
+
+    def parse(self, keys, single=()):
+        return sexpr.parse_partial(io.StringIO(FOOTPRINT), keys, single=single)
+
+    def heads(self, data):
+        return [item[0] for item in data if isinstance(item, list)]
+
+    def test_complete(self):
+        full = sexpr.parse_stream(io.StringIO(FOOTPRINT))
+        data = self.parse(['fp_text'])
+        self.assertEqual(data, [item for item in full if not isinstance(item, list) or item[0] == 'fp_text'])
+
+    def test_repeated_key_after_other_elements(self):
+        data = self.parse(['fp_text'])
+        self.assertEqual([item[1] for item in data[2:]], ['reference', 'value', 'user'])
+
+    def test_repeated_models(self):
+        data = self.parse(['model'])
+        self.assertEqual([item[1] for item in data[2:]], ['a.wrl', 'b.wrl'])
+
+    def test_repeated_key_not_declared_single(self):
+        # a key missing from single keeps the whole file read
+        data = self.parse(['descr', 'model'], single=['descr'])
+        self.assertEqual(self.heads(data), ['descr', 'model', 'model'])
+
+    def test_single_keys(self):
+        data = self.parse(['layer', 'descr'], single=['layer', 'tedit', 'descr'])
+        self.assertEqual(data, ['module', 'Test', ['layer', 'F.Cu'], ['descr', 'test footprint']])
+
+    def test_single_keys_stop_early(self):
+        # the rest of the file is not tokenized, so it may be broken
+        broken = FOOTPRINT.replace('(pad 1', '(pad (1')
+        data = sexpr.parse_partial(io.StringIO(broken), ['descr'], single=['descr'])
+        self.assertEqual(self.heads(data), ['descr'])
+
+if __name__ == '__main__':
+    unittest.main()
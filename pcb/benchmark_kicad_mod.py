@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmark of the KicadMod constructor.
+
+A BGA footprint with the given number of pads is generated and loaded with
+the single pass constructor of KicadMod and with the previous approach,
+which walked the module once for every attribute.
+
+example of use: ./benchmark_kicad_mod.py --pads 1000
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import math
+import os
+import tempfile
+import time
+import sys
+
+common = os.path.abspath(os.path.join(sys.path[0], '..','common'))
+
+if not common in sys.path:
+    sys.path.append(common)
+
+from kicad_mod import *
+
+class LookupArrays(object):
+    """
+    Look the arrays of an element up in the tree on every access
+    """
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key, default=None):
+        a = self.data.find(key, 2)
+        return a[0] if a else default
+
+    def __getitem__(self, key):
+        a = self.data.find(key, 2)
+        if not a:
+            raise KeyError(key)
+        return a[0]
+
+class MultiPassKicadMod(KicadMod):
+    """
+    KicadMod built the previous way, with one lookup in the tree for every
+    attribute of the module and of its elements
+    """
+    def _load(self):
+        self.name = self.sexpr_data[1]
+        self.layer = self._getValue('layer', 'pth', 2)
+        self.locked = self._hasValue(self.sexpr_data, 'locked')
+        self.description = self._getValue('descr', '', 2)
+        self.tags = self._getValue('tags', '', 2)
+        self.autoplace_cost90 = self._getValue('autoplace_cost90', 0, 2)
+        self.autoplace_cost180 = self._getValue('autoplace_cost180', 0, 2)
+        self.clearance = self._getValue('clearance', 0, 2)
+        self.solder_mask_margin = self._getValue('solder_mask_margin', 0, 2)
+        self.solder_paste_margin = self._getValue('solder_paste_margin', 0, 2)
+        self.solder_paste_ratio = self._getValue('solder_paste_ratio', 0, 2)
+        self.attribute = self._getValue('attr', 'pth', 2)
+        self.reference = self._getText('reference')[0]
+        self.value = self._getText('value')[0]
+        self.userText = self._getText('user')
+        self.lines = self._getLines()
+        self.circles = self._getCircles()
+        self.arcs = self._getArcs()
+        self.pads = self._getPads()
+        self.models = self._getModels()
+
+    def _getFirstArrays(self, data):
+        return LookupArrays(data)
+
+def parse_only(filename):
+    with open(filename) as f:
+        return sexpr.parse_stream(f, node=sexpr.SexprNode)
+
+def write_bga(filename, n_pads):
+    columns = int(math.ceil(math.sqrt(n_pads)))
+    size = columns + 1
+    name = 'BGA-{n}'.format(n=n_pads)
+
+    with open(filename, 'w') as f:
+        f.write('(module {name} (layer F.Cu) (tedit 5A02FF57)\n'.format(name=name))
+        f.write('  (descr "Generated BGA, {n} pads")\n'.format(n=n_pads))
+        f.write('  (tags BGA)\n')
+        f.write('  (attr smd)\n')
+        f.write('  (fp_text reference REF** (at 0 {y}) (layer F.SilkS)\n'.format(y=-size/2 - 1))
+        f.write('    (effects (font (size 1 1) (thickness 0.15)))\n  )\n')
+        f.write('  (fp_text value {name} (at 0 {y}) (layer F.Fab)\n'.format(name=name, y=size/2 + 1))
+        f.write('    (effects (font (size 1 1) (thickness 0.15)))\n  )\n')
+        f.write('  (fp_text user %R (at 0 0) (layer F.Fab)\n')
+        f.write('    (effects (font (size 1 1) (thickness 0.15)))\n  )\n')
+
+        corners = [(-1, -1), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+        for layer, width, offset in [('F.Fab', 0.1, 0), ('F.SilkS', 0.12, 0.11), ('F.CrtYd', 0.05, 1)]:
+            c = size / 2 + offset
+            for (x1, y1), (x2, y2) in zip(corners, corners[1:]):
+                f.write('  (fp_line (start {x1} {y1}) (end {x2} {y2}) (layer {l}) (width {w}))\n'.format(
+                    x1=x1*c, y1=y1*c, x2=x2*c, y2=y2*c, l=layer, w=width))
+
+        for i in range(n_pads):
+            row, col = divmod(i, columns)
+            f.write('  (pad {r}{c} smd circle (at {x} {y}) (size 0.5 0.5) (layers F.Cu F.Paste F.Mask))\n'.format(
+                r=chr(ord('A') + row % 26) * (1 + row // 26), c=col + 1,
+                x=col - (columns - 1) / 2, y=row - (columns - 1) / 2))
+
+        f.write('  (model ${{KISYS3DMOD}}/Package_BGA.3dshapes/{name}.wrl\n'.format(name=name))
+        f.write('    (at (xyz 0 0 0))\n    (scale (xyz 1 1 1))\n    (rotate (xyz 0 0 0))\n  )\n')
+        f.write(')\n')
+
+# the candidates are run in turn, so a slower phase of the machine affects
+# all of them, and the best run of each is reported
+def run(candidates, filename, repeat):
+    best = [None] * len(candidates)
+    gc.disable()
+    try:
+        for i in range(repeat):
+            for n, candidate in enumerate(candidates):
+                start = time.perf_counter()
+                candidate(filename)
+                elapsed = time.perf_counter() - start
+                if best[n] is None or elapsed < best[n]:
+                    best[n] = elapsed
+    finally:
+        gc.enable()
+    return best
+
+parser = argparse.ArgumentParser(description='Benchmark the KicadMod constructor on a generated BGA footprint')
+parser.add_argument('--pads', help='number of pads of the BGA (default = 1000)', type=int, default=1000)
+parser.add_argument('-n', '--repeat', help='number of runs, the best one is reported (default = 20)', type=int, default=20)
+
+args = parser.parse_args()
+
+# time the parsing, not the on-disk cache
+KicadMod.cache = None
+
+fd, filename = tempfile.mkstemp(suffix='.kicad_mod')
+os.close(fd)
+
+try:
+    write_bga(filename, args.pads)
+
+    # both constructors must give the same footprint
+    single = KicadMod(filename)
+    multi = MultiPassKicadMod(filename)
+    for attr in sorted(set(vars(single)) | set(vars(multi))):
+        if getattr(single, attr, None) != getattr(multi, attr, None):
+            print("Constructors differ for '{a}'".format(a=attr))
+            sys.exit(1)
+
+    t_parse, t_multi, t_single = run([parse_only, MultiPassKicadMod, KicadMod], filename, args.repeat)
+
+    print("BGA with {n} pads, {s:.1f} kB".format(n=args.pads, s=os.path.getsize(filename) / 1024))
+    print("s-expression parsing only: {t:.2f} ms".format(t=t_parse * 1000))
+    print("multi pass constructor:    {t:.2f} ms ({b:.2f} ms building)".format(t=t_multi * 1000, b=(t_multi - t_parse) * 1000))
+    print("single pass constructor:   {t:.2f} ms ({b:.2f} ms building)".format(t=t_single * 1000, b=(t_single - t_parse) * 1000))
+    print("speedup:                   {x:.2f}x".format(x=t_multi / t_single))
+finally:
+    os.remove(filename)
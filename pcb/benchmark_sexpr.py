@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the s-expression parsers of common/sexpr.py.
+
+Compares parse_sexp (whole file joined into a single string) against the
+streaming parse_stream and checks that both return the same data.
+
+example of use: ./benchmark_sexpr.py `find /usr/share/kicad/footprints -name *.kicad_mod`
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+import sys, os
+
+common = os.path.abspath(os.path.join(sys.path[0], '..','common'))
+
+if not common in sys.path:
+    sys.path.append(common)
+
+import sexpr
+
+# enable windows wildcards
+from glob import glob
+
+def parse_string(filename):
+    with open(filename) as f:
+        return sexpr.parse_sexp(''.join(f.readlines()))
+
+def parse_stream(filename):
+    with open(filename) as f:
+        return sexpr.parse_stream(f)
+
+def run(parser, files, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for filename in files:
+            parser(filename)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+parser = argparse.ArgumentParser(description='Benchmark the s-expression parsers on a set of KiCad files')
+parser.add_argument('files', nargs='+')
+parser.add_argument('-n', '--repeat', help='number of runs, the best one is reported (default = 3)', type=int, default=3)
+
+args = parser.parse_args()
+
+files = []
+for f in args.files:
+    files += glob(f)
+
+if len(files) == 0:
+    print("File argument invalid: {f}".format(f=args.files))
+    sys.exit(1)
+
+# check that both parsers agree before timing anything
+for filename in files:
+    if parse_string(filename) != parse_stream(filename):
+        print("parse_stream returned different data for '{f}'".format(f=filename))
+        sys.exit(1)
+
+size = sum(os.path.getsize(f) for f in files) / (1024 * 1024)
+
+print("{n} files, {s:.2f} MB".format(n=len(files), s=size))
+
+t_string = run(parse_string, files, args.repeat)
+t_stream = run(parse_stream, files, args.repeat)
+
+print("parse_sexp:   {t:.3f} s, {r:.2f} MB/s".format(t=t_string, r=size / t_string))
+print("parse_stream: {t:.3f} s, {r:.2f} MB/s".format(t=t_stream, r=size / t_stream))
+print("speedup:      {x:.2f}x".format(x=t_string / t_stream))
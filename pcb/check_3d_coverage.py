@@ -109,7 +109,7 @@ def parse_module(filename, warnings):
     if config.verbose:
         printer.green('Parsing: {f:s}'.format(f=filename))
     try:
-        module = KicadMod(filename)
+        module = KicadMod(filename, fields=['model'])
     except FileNotFoundError:
         printer.red('EXIT: problem reading module file {fn:s}'.format(fn=filename))
         sys.exit(1)
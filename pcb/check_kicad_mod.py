@@ -3,7 +3,10 @@
 from __future__ import print_function
 
 import argparse
+import io
+import multiprocessing
 import traceback
+from contextlib import redirect_stdout, redirect_stderr
 
 import sys,os
 
@@ -17,7 +20,7 @@ from print_color import *
 from rules import __all__ as all_rules
 from rules import *
 from rules.rule import KLCRule
-from rulebase import logError
+from rulebase import ErrorLog
 
 # enable windows wildcards
 from glob import glob
@@ -34,6 +37,8 @@ parser.add_argument('-s', '--silent', help='skip output for symbols passing all
 parser.add_argument('-e', '--errors', help='Do not suppress fatal parsing errors', action='store_true')
 parser.add_argument('-l', '--log', help="Path to JSON file to log error information")
 parser.add_argument('-w', '--nowarnings', help='Hide warnings (only show errors)', action='store_true')
+parser.add_argument('-j', '--jobs', help='number of footprints checked in parallel (default = 1, 0 = number of CPUs)', type=int, default=1)
+parser.add_argument('--no-cache', help='Parse all the footprints instead of using the cache of parsed files', action='store_true')
 
 args = parser.parse_args()
 if args.fixmore:
@@ -48,7 +53,8 @@ if args.verbose:
 
 KLCRule.verbosity = verbosity
 
-exit_code = 0
+if not args.no_cache:
+    KicadMod.cache = ParseCache()
 
 if args.rule:
     selected_rules = args.rule.split(",")
@@ -67,19 +73,16 @@ files = []
 for f in args.kicad_mod_files:
     files += glob(f)
 
-if len(files) == 0:
-    printer.red("File argument invalid: {f}".format(f=args.kicad_mod_files))
-    sys.exit(1)
-
-for filename in files:
-
+# check (and fix) a single footprint file
+# returns the increment of the exit code and the violations to be logged
+def checkFile(filename):
     if not os.path.exists(filename):
         printer.red('File does not exist: %s' % filename)
-        continue
+        return 0, []
 
     if not filename.endswith('.kicad_mod'):
         printer.red('File is not a .kicad_mod : %s' % filename)
-        continue
+        return 0, []
 
     lib_name = os.path.dirname(filename).split(os.path.sep)[-1].replace('.pretty', '')
 
@@ -93,8 +96,7 @@ for filename in files:
             if args.verbose:
                 #printer.red("Error: " + str(e))
                 traceback.print_exc()
-            exit_code += 1
-            continue
+            return 1, []
 
     if args.rotate!=0:
         module.rotateFootprint(int(args.rotate))
@@ -102,6 +104,8 @@ for filename in files:
 
     n_violations = 0
 
+    log_entries = []
+
     no_warnings = True
 
     output = []
@@ -134,6 +138,7 @@ for filename in files:
                 n_violations += rule.warningCount()
             rule.fixmore()
             rule.fix()
+            module.invalidate()
             rule.processOutput(printer, args.verbose, args.silent)
         elif rule.hasErrors():
             n_violations += rule.errorCount
@@ -141,10 +146,11 @@ for filename in files:
                 n_violations += rule.warningCount()
 
             if args.log:
-                logError(args.log, rule.name, lib_name, module.name)
+                log_entries.append((rule.name, lib_name, module.name))
 
             if args.fix:
                 rule.fix()
+                module.invalidate()
                 rule.processOutput(printer, args.verbose, args.silent)
                 rule.recheck()
 
@@ -153,14 +159,63 @@ for filename in files:
         if not args.silent:
             printer.green("Checking footprint '{fp}' - No errors".format(fp=module.name))
 
-    # increment the number of violations
-    if n_violations > 0:
-        exit_code += 1
-
     if ((args.fix or args.fixmore) and n_violations > 0) or args.rotate!=0:
         module.save()
 
-if args.fix:
-    printer.light_red('Some files were updated - ensure that they still load correctly in KiCad')
-
-sys.exit(exit_code)
+    # a footprint with violations increments the exit code
+    return (1 if n_violations > 0 else 0), log_entries
+
+# run checkFile in a worker process, the output is returned instead of printed
+# so that the main process can print it in the order of the files
+def checkFileBuffered(filename):
+    out = io.StringIO()
+    err = io.StringIO()
+    with redirect_stdout(out), redirect_stderr(err):
+        result = checkFile(filename)
+    return out.getvalue(), err.getvalue(), result
+
+def checkFiles(files, jobs):
+    if jobs == 1:
+        for filename in files:
+            yield checkFile(filename)
+        return
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for out, err, result in pool.imap(checkFileBuffered, files):
+            sys.stdout.write(out)
+            sys.stderr.write(err)
+            yield result
+    finally:
+        pool.terminate()
+
+if __name__ == '__main__':
+    if len(files) == 0:
+        printer.red("File argument invalid: {f}".format(f=args.kicad_mod_files))
+        sys.exit(1)
+
+    jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
+
+    # a file given twice must not be saved by two workers at the same time
+    if (args.fix or args.rotate!=0) and len(set(os.path.realpath(f) for f in files)) < len(files):
+        jobs = 1
+
+    exit_code = 0
+
+    # violations are written to the log once all the checks are done
+    error_log = ErrorLog(args.log) if args.log else None
+
+    try:
+        for file_exit_code, log_entries in checkFiles(files, jobs):
+            exit_code += file_exit_code
+
+            for rule_name, lib_name, module_name in log_entries:
+                error_log.add(rule_name, lib_name, module_name)
+    finally:
+        if error_log:
+            error_log.write()
+
+    if args.fix:
+        printer.light_red('Some files were updated - ensure that they still load correctly in KiCad')
+
+    sys.exit(exit_code)
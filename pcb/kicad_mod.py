@@ -6,10 +6,20 @@ from __future__ import division
 import time
 import re, math
 import sys, os
+from copy import copy
 sys.path.append(os.path.join('..','common'))
 
 import sexpr
 from boundingbox import BoundingBox
+from parse_cache import ParseCache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# NumPy is only used to transform at least this number of points
+_NUMPY_MIN_POINTS = 64
 
 # Rotate a point by given angle (in degrees)
 def _rotatePoint(point, degrees):
@@ -46,107 +56,297 @@ def _movePoint(point, offset):
 
     return p
 
+# Rotate (by degrees) and then move (by offset) points in place, with the
+# same results as _rotatePoint() and _movePoint(). A point appearing
+# several times is only transformed once.
+def _transformPoints(points, degrees=0, offset=(0, 0)):
+    points = list({id(p): p for p in points}.values())
+
+    if degrees:
+        radians = degrees * math.pi / 180
+        cos = math.cos(radians)
+        sin = math.sin(radians)
+
+        if numpy is not None and len(points) >= _NUMPY_MIN_POINTS:
+            xs = numpy.array([p['x'] for p in points], dtype=float)
+            ys = numpy.array([p['y'] for p in points], dtype=float)
+            new_xs = (xs * cos - ys * sin).tolist()
+            new_ys = (ys * cos + xs * sin).tolist()
+            for p, x, y in zip(points, new_xs, new_ys):
+                p['x'] = x
+                p['y'] = y
+        else:
+            for p in points:
+                x = p['x']
+                y = p['y']
+                p['x'] = x * cos - y * sin
+                p['y'] = y * cos + x * sin
+
+        for p in points:
+            if 'orientation' in p:
+                p['orientation'] -= degrees
+
+    dx, dy = offset
+    if dx or dy:
+        for p in points:
+            p['x'] += dx
+            p['y'] += dy
+
+# The points bounding an arc around center, from start over angle (in
+# degrees): its start and end points and the points where it crosses the
+# horizontal and vertical axes through the center
+def _arcPoints(center, start, angle):
+    cx = center['x']
+    cy = center['y']
+    dx = start['x'] - cx
+    dy = start['y'] - cy
+    r = math.sqrt(dx*dx + dy*dy)
+
+    radians = angle * math.pi / 180
+    points = [
+        {'x': start['x'], 'y': start['y']},
+        {'x': cx + dx * math.cos(radians) - dy * math.sin(radians),
+         'y': cy + dx * math.sin(radians) + dy * math.cos(radians)},
+        ]
+
+    a0 = math.degrees(math.atan2(dy, dx))
+    low = min(a0, a0 + angle)
+    high = max(a0, a0 + angle)
+
+    # the axes are crossed at the multiples of 90 degrees within the sweep
+    axes = [(r, 0), (0, r), (-r, 0), (0, -r)]
+    for k in range(int(math.ceil(low / 90)), int(math.floor(high / 90)) + 1):
+        x, y = axes[k % 4]
+        points.append({'x': cx + x, 'y': cy + y})
+
+    return points
+
+# The bounds (xmin, ymin, xmax, ymax) of any rotation of a pad, including
+# its drill offset
+def _padBounds(pad):
+    pos = pad['pos']
+    r = math.sqrt(pad['size']['x']**2 + pad['size']['y']**2) / 2
+
+    offset = pad['drill'].get('offset')
+    if offset and 'x' in offset:
+        r += math.sqrt(offset['x']**2 + offset['y']**2)
+
+    return (pos['x'] - r, pos['y'] - r, pos['x'] + r, pos['y'] + r)
+
+class SpatialIndex(object):
+    """
+    A uniform grid over the bounding boxes of items, to find the items which
+    may overlap an area without testing all of them
+
+    bounds is a function returning the (xmin, ymin, xmax, ymax) box of an
+    item, the cell size is the mean size of the boxes.
+    """
+
+    def __init__(self, items, bounds):
+        self.items = list(items)
+        self.boxes = [bounds(item) for item in self.items]
+
+        self.cell = 1.0
+        if self.boxes:
+            mean = sum(max(b[2] - b[0], b[3] - b[1]) for b in self.boxes) / len(self.boxes)
+            self.cell = max(mean, 0.1)
+
+        # (column, row) -> indexes of the items overlapping the cell
+        self.cells = {}
+        for i, box in enumerate(self.boxes):
+            for col in self._cells(box[0], box[2]):
+                for row in self._cells(box[1], box[3]):
+                    self.cells.setdefault((col, row), []).append(i)
+
+    def _cells(self, low, high):
+        return range(int(math.floor(low / self.cell)), int(math.floor(high / self.cell)) + 1)
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """
+        Return the items whose box overlaps the given one, in the order of
+        the items
+        """
+        cols = self._cells(xmin, xmax)
+        rows = self._cells(ymin, ymax)
+
+        # a large area is faster to test item by item
+        if len(cols) * len(rows) >= len(self.items):
+            indexes = range(len(self.items))
+        else:
+            found = set()
+            for col in cols:
+                for row in rows:
+                    found.update(self.cells.get((col, row), ()))
+            indexes = sorted(found)
+
+        boxes = self.boxes
+        return [self.items[i] for i in indexes if
+                boxes[i][0] <= xmax and boxes[i][2] >= xmin and
+                boxes[i][1] <= ymax and boxes[i][3] >= ymin]
+
 class KicadMod(object):
     """
     A class to parse kicad_mod files format of the KiCad
+
+    fields can be set to a list of top level keys (e.g. ['descr', 'tags'] or
+    ['model']) to load only those elements of the footprint. Everything else
+    keeps its default value (reference and value are None) and such a
+    partially loaded footprint can not be saved.
+
+    Set KicadMod.cache to a ParseCache to parse the complete footprints
+    through that on-disk cache, by default the files are always parsed.
     """
-    def __init__(self, filename):
-        self.filename = filename
 
-        # read the s-expression data
-        f = open(filename)
-        sexpr_data = ''.join(f.readlines())
+    cache = None
+
+    # the top level keys which appear at most once in a footprint, loading
+    # only those can stop before the end of the file
+    SINGLE_FIELDS = ('layer', 'tedit', 'descr', 'tags', 'attr',
+                     'autoplace_cost90', 'autoplace_cost180', 'clearance',
+                     'solder_mask_margin', 'solder_paste_margin',
+                     'solder_paste_ratio')
 
-        # parse s-expr
-        sexpr_data = sexpr.parse_sexp(sexpr_data)
+    def __init__(self, filename, fields=None):
+        self.filename = filename
+        self.fields = fields
+
+        # read and parse the s-expression data
+        if fields is None and self.cache is not None:
+            sexpr_data = self.cache.parse(filename, node=sexpr.SexprNode)
+        else:
+            with open(filename) as f:
+                if fields is None:
+                    sexpr_data = sexpr.parse_stream(f, node=sexpr.SexprNode)
+                else:
+                    sexpr_data = sexpr.parse_partial(f, fields, node=sexpr.SexprNode,
+                                                      single=self.SINGLE_FIELDS)
         self.sexpr_data = sexpr_data
 
+        self._initCaches()
+        self._load()
+
+    # The data derived from the elements of the module, see invalidate()
+    def _initCaches(self):
+        # bumped by invalidate(), the cached geometry of older versions is
+        # computed again
+        self.version = 0
+
+        # SpatialIndex of the pads, built on first use
+        self._pad_index = None
+
+        # layer -> lines, circles, arcs and texts, built on first use
+        self._layers = None
+        self._layers_key = None
+
+        # memoized bounding boxes, see _memoize()
+        self._geometry = {}
+
+    # Set the attributes of the module from sexpr_data
+    def _load(self):
         # module name
         self.name = self.sexpr_data[1]
 
-        # module layer
-        self.layer = self._getValue('layer', 'pth', 2)
-
         # locked flag
-        self.locked = self._getValue('locked', False, 2)
+        self.locked = self._hasValue(self.sexpr_data, 'locked')
+
+        header = {}
+        texts = {'reference': [], 'value': [], 'user': []}
+
+        self.lines = []
+        self.circles = []
+        self.arcs = []
+        self.pads = []
+        self.models = []
+
+        # parser and destination list of the graphical items, pads and models
+        elements = {
+            'fp_line': (self._parseLine, self.lines),
+            'fp_circle': (self._parseCircle, self.circles),
+            'fp_arc': (self._parseArc, self.arcs),
+            'pad': (self._parsePad, self.pads),
+            'model': (self._parseModel, self.models),
+            }
+
+        # sort all the elements of the module in a single pass
+        for element in self.sexpr_data:
+            if not isinstance(element, list) or len(element) < 2:
+                continue
+
+            key = element[0]
+
+            if key in elements:
+                parse, items = elements[key]
+                items.append(parse(element))
+            elif key == 'fp_text':
+                if element[1] in texts:
+                    texts[element[1]].append(self._parseText(element))
+            elif key not in header:
+                header[key] = element[1]
+
+        # module layer
+        self.layer = header.get('layer', 'pth')
 
         # description
-        self.description = self._getValue('descr', '', 2)
+        self.description = header.get('descr', '')
 
         # tags
-        self.tags = self._getValue('tags', '', 2)
+        self.tags = header.get('tags', '')
 
         # auto place settings
-        self.autoplace_cost90 = self._getValue('autoplace_cost90', 0, 2)
-        self.autoplace_cost180 = self._getValue('autoplace_cost180', 0, 2)
+        self.autoplace_cost90 = header.get('autoplace_cost90', 0)
+        self.autoplace_cost180 = header.get('autoplace_cost180', 0)
 
         # global footprint clearance settings
-        self.clearance = self._getValue('clearance', 0, 2)
-        self.solder_mask_margin = self._getValue('solder_mask_margin', 0, 2)
-        self.solder_paste_margin = self._getValue('solder_paste_margin', 0, 2)
-        self.solder_paste_ratio = self._getValue('solder_paste_ratio', 0, 2)
+        self.clearance = header.get('clearance', 0)
+        self.solder_mask_margin = header.get('solder_mask_margin', 0)
+        self.solder_paste_margin = header.get('solder_paste_margin', 0)
+        self.solder_paste_ratio = header.get('solder_paste_ratio', 0)
 
         # attribute
-        self.attribute =  self._getValue('attr', 'pth', 2)
+        self.attribute = header.get('attr', 'pth')
 
         # reference
-        self.reference = self._getText('reference')[0]
+        self.reference = texts['reference'][0] if self._isLoaded('fp_text') else None
 
         # value
-        self.value = self._getText('value')[0]
+        self.value = texts['value'][0] if self._isLoaded('fp_text') else None
 
         # user text
-        self.userText = self._getText('user')
+        self.userText = texts['user']
 
-        # lines
-        self.lines = self._getLines()
+    # check if the elements with the given key were loaded from file
+    def _isLoaded(self, key):
+        return self.fields is None or key in self.fields
 
-        # circles
-        self.circles = self._getCircles()
-
-        # arcs
-        self.arcs = self._getArcs()
-
-        # pads
-        self.pads = self._getPads()
-
-        # models
-        self.models = self._getModels()
-
-    # check if value exists in any element of data
+    # check if value is one of the elements (flags like 'hide') of data
     def _hasValue(self, data, value):
-        for i in data:
-            if type(i) in [list, tuple]:
-                if self._hasValue(i, value):
-                    return True
-            elif str(i) == value:
-                return True
-        return False
-
-    # return the array which has value as first element
-    def _getArray(self, data, value, result=None, level=0, max_level = None):
-        if result is None: result = []
-
-        if max_level is not None and max_level <= level:
-            return result
-
-        level += 1
-
-        for i in data:
-            if type(i) == type([]):
-                self._getArray(i, value, result, level=level,
-                        max_level=max_level)
-            else:
-                if i == value:
-                    result.append(data)
-        return result
+        return value in data
+
+    # check if the element is placed on the given layer
+    def _onLayer(self, data, layer):
+        return any(layer in a for a in self._getArray(data, 'layer', 2))
+
+    # return the arrays which have value as first element
+    # max_level limits the search depth (1 = data, 2 = its children, ...)
+    def _getArray(self, data, value, max_level=None):
+        return data.find(value, max_level)
+
+    # return the first child array of data for each key (first element),
+    # so an element can be parsed with a single pass over its children
+    def _getFirstArrays(self, data):
+        arrays = {}
+        for a in data:
+            if isinstance(a, list) and a and not isinstance(a[0], list) and a[0] not in arrays:
+                arrays[a[0]] = a
+        return arrays
 
     # update or create an array
     def _updateCreateArray(self, array, place_after=None):
         # check if array exists
         # first element of array is used as key
         # this function only works for arrays which has a single occurrence
-        found_array = self._getArray(self.sexpr_data, array[0])
+        array = sexpr.SexprNode(array)
+        found_array = self._getArray(self.sexpr_data, array[0], 2)
         if found_array:
             index = self.sexpr_data.index(found_array[0])
             self.sexpr_data.pop(index)
@@ -159,8 +359,9 @@ class KicadMod(object):
         # place_after must be an array with the desired position name
         # once the first name match the new array will be placed after
         # the last matched occurrence of the name
+        new_array = sexpr.SexprNode(new_array)
         for field in place_after:
-            pos_array = self._getArray(self.sexpr_data, field)
+            pos_array = self._getArray(self.sexpr_data, field, 2)
             if pos_array:
                 index = len(self.sexpr_data) - self.sexpr_data[::-1].index(pos_array[-1]) - 1
                 self.sexpr_data.insert(index + 1, new_array)
@@ -176,45 +377,50 @@ class KicadMod(object):
         a = self._getArray(self.sexpr_data, array, max_level=max_level)
         return def_value if not a else a[0][1]
 
-    def _getText(self, which_text):
-        result = []
-        for text in self._getArray(self.sexpr_data, 'fp_text'):
-            if text[1] == which_text:
-                text_dict = {}
-                text_dict[which_text] = text[2]
+    # parse a fp_text element, the text is stored with its type as key
+    def _parseText(self, text):
+        which_text = text[1]
+        text_dict = {}
+        text_dict[which_text] = text[2]
+
+        # text position
+        a = self._getArray(text, 'at', 2)[0]
+        text_dict['pos'] = {'x':a[1], 'y':a[2], 'orientation':0}
+        if len(a) > 3: text_dict['pos']['orientation'] = a[3]
 
-                # text position
-                a = self._getArray(text, 'at')[0]
-                text_dict['pos'] = {'x':a[1], 'y':a[2], 'orientation':0}
-                if len(a) > 3: text_dict['pos']['orientation'] = a[3]
+        # text layer
+        a = self._getArray(text, 'layer', 2)[0]
+        text_dict['layer'] = a[1]
 
-                # text layer
-                a = self._getArray(text, 'layer')[0]
-                text_dict['layer'] = a[1]
+        # text font (inside effects)
+        font = self._getArray(text, 'font', 3)[0]
 
-                # text font
-                font = self._getArray(text, 'font')[0]
+        # Some footprints miss out some parameters
+        text_dict['font'] = {'thickness': 0, 'height': 0, 'width': 0}
 
-                # Some footprints miss out some parameters
-                text_dict['font'] = {'thickness': 0, 'height': 0, 'width': 0}
+        for pair in font[1:]:
+            key = pair[0]
+            data = pair[1:]
 
-                for pair in font[1:]:
-                    key = pair[0]
-                    data = pair[1:]
+            if key == 'thickness':
+                text_dict['font']['thickness'] = data[0]
 
-                    if key == 'thickness':
-                        text_dict['font']['thickness'] = data[0]
+            elif key == 'size':
+                text_dict['font']['height'] = data[0]
+                text_dict['font']['width'] = data[1]
 
-                    elif key == 'size':
-                        text_dict['font']['height'] = data[0]
-                        text_dict['font']['width'] = data[1]
+        text_dict['font']['italic'] = self._hasValue(a, 'italic')
 
-                text_dict['font']['italic'] = self._hasValue(a, 'italic')
+        # text hide
+        text_dict['hide'] = self._hasValue(text, 'hide')
 
-                # text hide
-                text_dict['hide'] = self._hasValue(text, 'hide')
+        return text_dict
 
-                result.append(text_dict)
+    def _getText(self, which_text):
+        result = []
+        for text in self._getArray(self.sexpr_data, 'fp_text', 2):
+            if text[1] == which_text:
+                result.append(self._parseText(text))
 
         return result
 
@@ -224,276 +430,292 @@ class KicadMod(object):
             user[key] = params[key]
 
         self.userText.append(user)
+        self.invalidate()
+
+    def _parseLine(self, line):
+        line_dict = {}
+        arrays = self._getFirstArrays(line)
+        a = arrays['start']
+        line_dict['start'] = {'x':a[1], 'y':a[2]}
+
+        a = arrays['end']
+        line_dict['end'] = {'x':a[1], 'y':a[2]}
+
+        try:
+            a = arrays['layer']
+            line_dict['layer'] = a[1]
+        except:
+            line_dict['layer'] = ''
+
+        try:
+            a = arrays['width']
+            line_dict['width'] = a[1]
+        except:
+            line_dict['width'] = 0
+
+        return line_dict
 
     def _getLines(self, layer=None):
         lines = []
-        for line in self._getArray(self.sexpr_data, 'fp_line'):
-            line_dict = {}
-            if self._hasValue(line, layer) or layer == None:
-                a = self._getArray(line, 'start')[0]
-                line_dict['start'] = {'x':a[1], 'y':a[2]}
+        for line in self._getArray(self.sexpr_data, 'fp_line', 2):
+            # filter layers, None = all layers
+            if layer == None or self._onLayer(line, layer):
+                lines.append(self._parseLine(line))
+
+        return lines
 
-                a = self._getArray(line, 'end')[0]
-                line_dict['end'] = {'x':a[1], 'y':a[2]}
+    def _parseCircle(self, circle):
+        circle_dict = {}
+        arrays = self._getFirstArrays(circle)
+        a = arrays['center']
+        circle_dict['center'] = {'x':a[1], 'y':a[2]}
 
-                try:
-                    a = self._getArray(line, 'layer')[0]
-                    line_dict['layer'] = a[1]
-                except:
-                    line_dict['layer'] = ''
+        a = arrays['end']
+        circle_dict['end'] = {'x':a[1], 'y':a[2]}
 
-                try:
-                    a = self._getArray(line, 'width')[0]
-                    line_dict['width'] = a[1]
-                except:
-                    line_dict['width'] = 0
+        try:
+            a = arrays['layer']
+            circle_dict['layer'] = a[1]
+        except:
+            circle_dict['layer'] = ''
 
-                lines.append(line_dict)
+        try:
+            a = arrays['width']
+            circle_dict['width'] = a[1]
+        except:
+            circle_dict['width'] = 0
 
-        return lines
+        return circle_dict
 
     def _getCircles(self, layer=None):
         circles = []
-        for circle in self._getArray(self.sexpr_data, 'fp_circle'):
-            circle_dict = {}
+        for circle in self._getArray(self.sexpr_data, 'fp_circle', 2):
             # filter layers, None = all layers
-            if self._hasValue(circle, layer) or layer == None:
-                a = self._getArray(circle, 'center')[0]
-                circle_dict['center'] = {'x':a[1], 'y':a[2]}
+            if layer == None or self._onLayer(circle, layer):
+                circles.append(self._parseCircle(circle))
 
-                a = self._getArray(circle, 'end')[0]
-                circle_dict['end'] = {'x':a[1], 'y':a[2]}
+        return circles
 
-                try:
-                    a = self._getArray(circle, 'layer')[0]
-                    circle_dict['layer'] = a[1]
-                except:
-                    circle_dict['layer'] = ''
+    def _parseArc(self, arc):
+        arc_dict = {}
+        arrays = self._getFirstArrays(arc)
+        a = arrays['start']
+        arc_dict['start'] = {'x':a[1], 'y':a[2]}
 
-                try:
-                    a = self._getArray(circle, 'width')[0]
-                    circle_dict['width'] = a[1]
-                except:
-                    circle_dict['width'] = 0
+        a = arrays['end']
+        arc_dict['end'] = {'x':a[1], 'y':a[2]}
 
-                circles.append(circle_dict)
+        a = arrays['angle']
+        arc_dict['angle'] = a[1]
 
-        return circles
+        try:
+            a = arrays['layer']
+            arc_dict['layer'] = a[1]
+        except:
+            arc_dict['layer'] = ''
+
+        try:
+            a = arrays['width']
+            arc_dict['width'] = a[1]
+        except:
+            arc_dict['width'] = 0
+
+        return arc_dict
 
     def _getArcs(self, layer=None):
         arcs = []
-        for arc in self._getArray(self.sexpr_data, 'fp_arc'):
-            arc_dict = {}
+        for arc in self._getArray(self.sexpr_data, 'fp_arc', 2):
             # filter layers, None = all layers
-            if self._hasValue(arc, layer) or layer == None:
-                a = self._getArray(arc, 'start')[0]
-                arc_dict['start'] = {'x':a[1], 'y':a[2]}
-
-                a = self._getArray(arc, 'end')[0]
-                arc_dict['end'] = {'x':a[1], 'y':a[2]}
-
-                a = self._getArray(arc, 'angle')[0]
-                arc_dict['angle'] = a[1]
+            if layer == None or self._onLayer(arc, layer):
+                arcs.append(self._parseArc(arc))
 
-                try:
-                    a = self._getArray(arc, 'layer')[0]
-                    arc_dict['layer'] = a[1]
-                except:
-                    arc_dict['layer'] = ''
+        return arcs
 
-                try:
-                    a = self._getArray(arc, 'width')[0]
-                    arc_dict['width'] = a[1]
-                except:
-                    arc_dict['width'] = 0
+    def _parsePad(self, pad):
+        # number, type, shape
+        pad_dict = {'number':pad[1], 'type':pad[2], 'shape':pad[3]}
+        arrays = self._getFirstArrays(pad)
 
-                arcs.append(arc_dict)
+        # position
+        a = arrays['at']
+        pad_dict['pos'] = {'x':a[1], 'y':a[2], 'orientation':0}
+        if len(a) > 3: pad_dict['pos']['orientation'] = a[3]
+
+        # size
+        a = arrays['size']
+        pad_dict['size'] = {'x':a[1], 'y':a[2]}
+
+        # layers
+        a = arrays['layers']
+        pad_dict['layers'] = a[1:]
+
+        # rect delta
+        pad_dict['rect_delta'] = {}
+        a = arrays.get('rect_delta')
+        if a: pad_dict['rect_delta'] = a[1:]
+
+        # drill, there is only one drill per pad
+        pad_dict['drill'] = {}
+        drill = arrays.get('drill')
+        if drill:
+            # offset
+            pad_dict['drill']['offset'] = {}
+            offset = self._getArray(drill, 'offset', 2)
+            if offset:
+                offset = offset[0]
+                pad_dict['drill']['offset'] = {'x':offset[1], 'y':offset[2]}
+                drill.remove(offset)
+
+            # shape
+            if self._hasValue(drill, 'oval'):
+                drill.remove('oval')
+                pad_dict['drill']['shape'] = 'oval'
+            else:
+                pad_dict['drill']['shape'] = 'circular'
 
-        return arcs
+            # size
+            pad_dict['drill']['size'] = {}
+            if len(drill) > 1:
+                x = drill[1]
+                y = drill[2] if len(drill) > 2 else x
+                pad_dict['drill']['size'] = {'x':x, 'y':y}
 
-    def _getPads(self):
-        pads = []
-        for pad in self._getArray(self.sexpr_data, 'pad'):
-            # number, type, shape
-            pad_dict = {'number':pad[1], 'type':pad[2], 'shape':pad[3]}
+        # die length
+        pad_dict['die_length'] = {}
+        a = arrays.get('die_length')
+        if a: pad_dict['die_length'] = a[1]
 
-            # position
-            a = self._getArray(pad, 'at')[0]
-            pad_dict['pos'] = {'x':a[1], 'y':a[2], 'orientation':0}
-            if len(a) > 3: pad_dict['pos']['orientation'] = a[3]
+        ## clearances zones settings
+        # clearance
+        pad_dict['clearance'] = {}
+        a = arrays.get('clearance')
+        if a: pad_dict['clearance'] = a[1]
+        # solder mask margin
+        pad_dict['solder_mask_margin'] = {}
+        a = arrays.get('solder_mask_margin')
+        if a: pad_dict['solder_mask_margin'] = a[1]
+        # solder paste margin
+        pad_dict['solder_paste_margin'] = {}
+        a = arrays.get('solder_paste_margin')
+        if a: pad_dict['solder_paste_margin'] = a[1]
+        # solder paste margin ratio
+        pad_dict['solder_paste_margin_ratio'] = {}
+        a = arrays.get('solder_paste_margin_ratio')
+        if a: pad_dict['solder_paste_margin_ratio'] = a[1]
 
-            # size
-            a = self._getArray(pad, 'size')[0]
-            pad_dict['size'] = {'x':a[1], 'y':a[2]}
-
-            # layers
-            a = self._getArray(pad, 'layers')[0]
-            pad_dict['layers'] = a[1:]
-
-            # rect delta
-            pad_dict['rect_delta'] = {}
-            a = self._getArray(pad, 'rect_delta')
-            if a: pad_dict['rect_delta'] = a[0][1:]
-
-            # drill
-            pad_dict['drill'] = {}
-            drill = self._getArray(pad, 'drill')
-            if drill:
-                # there is only one drill per pad
-                drill = drill[0]
-
-                # offset
-                pad_dict['drill']['offset'] = {}
-                offset = self._getArray(drill, 'offset')
-                if offset:
-                    offset = offset[0]
-                    pad_dict['drill']['offset'] = {'x':offset[1], 'y':offset[2]}
-                    drill.remove(offset)
-
-                # shape
-                if self._hasValue(drill, 'oval'):
-                    drill.remove('oval')
-                    pad_dict['drill']['shape'] = 'oval'
-                else:
-                    pad_dict['drill']['shape'] = 'circular'
-
-                # size
-                pad_dict['drill']['size'] = {}
-                if len(drill) > 1:
-                    x = drill[1]
-                    y = drill[2] if len(drill) > 2 else x
-                    pad_dict['drill']['size'] = {'x':x, 'y':y}
-
-            # die length
-            pad_dict['die_length'] = {}
-            a = self._getArray(pad, 'die_length')
-            if a: pad_dict['die_length'] = a[0][1]
-
-            ## clearances zones settings
-            # clearance
-            pad_dict['clearance'] = {}
-            a = self._getArray(pad, 'clearance')
-            if a: pad_dict['clearance'] = a[0][1]
-            # solder mask margin
-            pad_dict['solder_mask_margin'] = {}
-            a = self._getArray(pad, 'solder_mask_margin')
-            if a: pad_dict['solder_mask_margin'] = a[0][1]
-            # solder paste margin
-            pad_dict['solder_paste_margin'] = {}
-            a = self._getArray(pad, 'solder_paste_margin')
-            if a: pad_dict['solder_paste_margin'] = a[0][1]
-            # solder paste margin ratio
-            pad_dict['solder_paste_margin_ratio'] = {}
-            a = self._getArray(pad, 'solder_paste_margin_ratio')
-            if a: pad_dict['solder_paste_margin_ratio'] = a[0][1]
-
-            ## copper zones settings
-            # zone connect
-            pad_dict['zone_connect'] = {}
-            a = self._getArray(pad, 'zone_connect')
-            if a: pad_dict['zone_connect'] = a[0][1]
-            # thermal width
-            pad_dict['thermal_width'] = {}
-            a = self._getArray(pad, 'thermal_width')
-            if a: pad_dict['thermal_width'] = a[0][1]
-            # thermal gap
-            pad_dict['thermal_gap'] = {}
-            a = self._getArray(pad, 'thermal_gap')
-            if a: pad_dict['thermal_gap'] = a[0][1]
-
-            # Custom pad shape settings
-            if pad_dict['shape'] == 'custom':
-                # Get options
-                pad_dict['options'] = {'clearance': {}, 'anchor': {}}
-                a = self._getArray(pad, 'options')
-                c = self._getArray(a, 'clearance')
+        ## copper zones settings
+        # zone connect
+        pad_dict['zone_connect'] = {}
+        a = arrays.get('zone_connect')
+        if a: pad_dict['zone_connect'] = a[1]
+        # thermal width
+        pad_dict['thermal_width'] = {}
+        a = arrays.get('thermal_width')
+        if a: pad_dict['thermal_width'] = a[1]
+        # thermal gap
+        pad_dict['thermal_gap'] = {}
+        a = arrays.get('thermal_gap')
+        if a: pad_dict['thermal_gap'] = a[1]
+
+        # Custom pad shape settings
+        if pad_dict['shape'] == 'custom':
+            # Get options
+            pad_dict['options'] = {'clearance': {}, 'anchor': {}}
+            for a in self._getArray(pad, 'options', 2):
+                c = self._getArray(a, 'clearance', 2)
                 if c:
                     pad_dict['options']['clearance'] = c[0][1]
-                c = self._getArray(a, 'anchor')
+                c = self._getArray(a, 'anchor', 2)
                 if c:
                     pad_dict['options']['anchor'] = c[0][1]
 
-                # Get primitives
-                pad_dict['primitives'] = []
-                a = self._getArray(pad, 'primitives')
-                if a:
-                    for primitive in a[0][1:]:
-                        p = {}
-                        # Everything has a width
-                        p['width'] = {}
-                        w = self._getArray(primitive, 'width')
-                        if w: p['width'] = w[0][1]
-                        # Set primitive type
-                        p['type'] = primitive[0]
-                        if primitive[0] == 'gr_poly':
-                            # Read the polygon's points
-                            p['pts'] = []
-                            pts = self._getArray(primitive, 'pts')
-                            for pt in pts[0][1:]:
-                                p['pts'].append({
-                                    'x': pt[1],
-                                    'y': pt[2]})
-                        elif primitive[0] == 'gr_line':
-                            # Read the line's start
-                            p['start'] = {}
-                            s = self._getArray(primitive, 'start')
-                            if s: p['start'] = {'x': s[0][1], 'y': s[0][2]}
-                            # Read the line's end
-                            p['end'] = {}
-                            e = self._getArray(primitive, 'end')
-                            if e: p['end'] = {'x': e[0][1], 'y': e[0][2]}
-                        elif primitive[0] == 'gr_arc':
-                            # Read the arc's start
-                            p['start'] = {}
-                            s = self._getArray(primitive, 'start')
-                            if s: p['start'] = {'x': s[0][1], 'y': s[0][2]}
-                            # Read the arc's end
-                            p['end'] = {}
-                            e = self._getArray(primitive, 'end')
-                            if e: p['end'] = {'x': e[0][1], 'y': e[0][2]}
-                            # Read the arc's angle
-                            p['angle'] = {}
-                            n = self._getArray(primitive, 'angle')
-                            if n: p['angle'] = n[0][1]
-                        elif primitive[0] == 'gr_circle':
-                            # Read the line's start
-                            p['center'] = {}
-                            c = self._getArray(primitive, 'center')
-                            if c: p['center'] = {'x': c[0][1], 'y': c[0][2]}
-                            # Read the line's end
-                            p['end'] = {}
-                            e = self._getArray(primitive, 'end')
-                            if e: p['end'] = {'x': e[0][1], 'y': e[0][2]}
-
-                        pad_dict['primitives'].append(p)
-
-            pads.append(pad_dict)
+            # Get primitives
+            pad_dict['primitives'] = []
+            a = self._getArray(pad, 'primitives', 2)
+            if a:
+                for primitive in a[0][1:]:
+                    p = {}
+                    # Everything has a width
+                    p['width'] = {}
+                    w = self._getArray(primitive, 'width', 2)
+                    if w: p['width'] = w[0][1]
+                    # Set primitive type
+                    p['type'] = primitive[0]
+                    if primitive[0] == 'gr_poly':
+                        # Read the polygon's points
+                        p['pts'] = []
+                        pts = self._getArray(primitive, 'pts', 2)
+                        for pt in pts[0][1:]:
+                            p['pts'].append({
+                                'x': pt[1],
+                                'y': pt[2]})
+                    elif primitive[0] == 'gr_line':
+                        # Read the line's start
+                        p['start'] = {}
+                        s = self._getArray(primitive, 'start', 2)
+                        if s: p['start'] = {'x': s[0][1], 'y': s[0][2]}
+                        # Read the line's end
+                        p['end'] = {}
+                        e = self._getArray(primitive, 'end', 2)
+                        if e: p['end'] = {'x': e[0][1], 'y': e[0][2]}
+                    elif primitive[0] == 'gr_arc':
+                        # Read the arc's start
+                        p['start'] = {}
+                        s = self._getArray(primitive, 'start', 2)
+                        if s: p['start'] = {'x': s[0][1], 'y': s[0][2]}
+                        # Read the arc's end
+                        p['end'] = {}
+                        e = self._getArray(primitive, 'end', 2)
+                        if e: p['end'] = {'x': e[0][1], 'y': e[0][2]}
+                        # Read the arc's angle
+                        p['angle'] = {}
+                        n = self._getArray(primitive, 'angle', 2)
+                        if n: p['angle'] = n[0][1]
+                    elif primitive[0] == 'gr_circle':
+                        # Read the line's start
+                        p['center'] = {}
+                        c = self._getArray(primitive, 'center', 2)
+                        if c: p['center'] = {'x': c[0][1], 'y': c[0][2]}
+                        # Read the line's end
+                        p['end'] = {}
+                        e = self._getArray(primitive, 'end', 2)
+                        if e: p['end'] = {'x': e[0][1], 'y': e[0][2]}
+
+                    pad_dict['primitives'].append(p)
+        return pad_dict
+
+    def _getPads(self):
+        pads = []
+        for pad in self._getArray(self.sexpr_data, 'pad', 2):
+            pads.append(self._parsePad(pad))
 
         return pads
 
-    def _getModels(self):
-        models_array = self._getArray(self.sexpr_data, 'model')
+    def _parseModel(self, model):
+        model_dict = {'file':model[1]}
+        arrays = self._getFirstArrays(model)
 
-        models = []
-        for model in models_array:
-            model_dict = {'file':model[1]}
+        # position
+        offset = arrays.get('at')
+        if offset is None:
+            offset = arrays['offset']
+        xyz = self._getArray(offset, 'xyz', 2)[0]
+        model_dict['pos'] = {'x':xyz[1], 'y':xyz[2], 'z':xyz[3]}
 
-            # position
-            offset = self._getArray(model, 'at')
-            if len(offset) < 1:
-                offset = self._getArray(model, 'offset')
-            xyz = self._getArray(offset, 'xyz')[0]
-            model_dict['pos'] = {'x':xyz[1], 'y':xyz[2], 'z':xyz[3]}
+        # scale
+        xyz = self._getArray(arrays['scale'], 'xyz', 2)[0]
+        model_dict['scale'] = {'x':xyz[1], 'y':xyz[2], 'z':xyz[3]}
 
-            # scale
-            xyz = self._getArray(self._getArray(model, 'scale'), 'xyz')[0]
-            model_dict['scale'] = {'x':xyz[1], 'y':xyz[2], 'z':xyz[3]}
+        # rotate
+        xyz = self._getArray(arrays['rotate'], 'xyz', 2)[0]
+        model_dict['rotate'] = {'x':xyz[1], 'y':xyz[2], 'z':xyz[3]}
 
-            # rotate
-            xyz = self._getArray(self._getArray(model, 'rotate'), 'xyz')[0]
-            model_dict['rotate'] = {'x':xyz[1], 'y':xyz[2], 'z':xyz[3]}
+        return model_dict
 
-            models.append(model_dict)
+    def _getModels(self):
+        models = []
+        for model in self._getArray(self.sexpr_data, 'model', 2):
+            models.append(self._parseModel(model))
 
         return models
 
@@ -507,6 +729,7 @@ class KicadMod(object):
         # rotate
         model_dict['rotate'] = {'x':rotate[0], 'y':rotate[1], 'z':rotate[2]}
         self.models.append(model_dict)
+        self.invalidate()
 
     def addLine(self, start, end, layer, width):
         line={
@@ -516,6 +739,7 @@ class KicadMod(object):
                'width': width
              }
         self.lines.append( line)
+        self.invalidate()
 
     def addRectangle(self, start, end, layer, width):
         self.addLine( [ start[0], start[1] ], [ end[0], start[1] ], layer, width)
@@ -524,116 +748,111 @@ class KicadMod(object):
         self.addLine( [ end[0], end[1] ], [ start[0], end[1] ], layer, width)
 
 
-    def setAnchor(self, anchor_point):
-        # change reference position
-        self.reference['pos']['x'] -= anchor_point[0]
-        self.reference['pos']['y'] -= anchor_point[1]
+    # Drop the cached layers, pad index and geometry of the footprint. It is
+    # done by the methods changing the footprint and must be called after
+    # its elements are changed directly
+    def invalidate(self):
+        self.version += 1
+        self._pad_index = None
+        self._layers = None
+        self._geometry = {}
 
-        # change value position
-        self.value['pos']['x'] -= anchor_point[0]
-        self.value['pos']['y'] -= anchor_point[1]
+    # The lines, circles, arcs and texts of each layer, rebuilt when elements
+    # are added or removed
+    def _getLayers(self):
+        lists = (self.lines, self.circles, self.arcs, self.userText)
+        key = tuple((id(items), len(items)) for items in lists) + (id(self.reference), id(self.value))
 
-        # change user text position
-        for text in self.userText:
-            text['pos']['x'] -= anchor_point[0]
-            text['pos']['y'] -= anchor_point[1]
+        if self._layers is None or self._layers_key != key:
+            texts = [text for text in [self.reference, self.value] if text is not None] + self.userText
 
-        # change lines position
-        for line in self.lines:
-            line['start']['x'] -= anchor_point[0]
-            line['end']['x'] -= anchor_point[0]
-            line['start']['y'] -= anchor_point[1]
-            line['end']['y'] -= anchor_point[1]
+            self._layers = {}
+            for kind, items in (('lines', self.lines), ('circles', self.circles),
+                                ('arcs', self.arcs), ('texts', texts)):
+                layers = {}
+                for item in items:
+                    layers.setdefault(item['layer'], []).append(item)
+                self._layers[kind] = layers
 
-        # change circles position
-        for circle in self.circles:
-            circle['center']['x'] -= anchor_point[0]
-            circle['end']['x'] -= anchor_point[0]
-            circle['center']['y'] -= anchor_point[1]
-            circle['end']['y'] -= anchor_point[1]
+            self._layers_key = key
 
-        # change arcs position
-        for arc in self.arcs:
-            arc['start']['x'] -= anchor_point[0]
-            arc['end']['x'] -= anchor_point[0]
-            arc['start']['y'] -= anchor_point[1]
-            arc['end']['y'] -= anchor_point[1]
+        return self._layers
 
-        # change pads positions
-        for pad in self.pads:
-            pad['pos']['x'] -= anchor_point[0]
-            pad['pos']['y'] -= anchor_point[1]
+    # The positions of the texts, graphics and pads
+    def _getPoints(self):
+        points = [self.reference['pos'], self.value['pos']]
+        points.extend(text['pos'] for text in self.userText)
 
-        # change models
-        for model in self.models:
-            model['pos']['x'] -= anchor_point[0]/25.4
-            model['pos']['y'] += anchor_point[1]/25.4
-
-
-
-    def rotateFootprint(self, degrees):
-        # change reference position
-        self.reference['pos']=_rotatePoint(self.reference['pos'], degrees)
+        for line in self.lines:
+            points.append(line['start'])
+            points.append(line['end'])
 
-        # change value position
-        self.value['pos']=_rotatePoint(self.value['pos'], degrees)
+        for circle in self.circles:
+            points.append(circle['center'])
+            points.append(circle['end'])
 
-        # change user text position
-        for text in self.userText:
-            text['pos']=_rotatePoint(text['pos'], degrees)
+        for arc in self.arcs:
+            points.append(arc['start'])
+            points.append(arc['end'])
 
+        points.extend(pad['pos'] for pad in self.pads)
 
-        # change lines position
-        for line in self.lines:
-            line['start']=_rotatePoint(line['start'], degrees)
-            line['end']=_rotatePoint(line['end'], degrees)
+        return points
 
-        # change circles position
-        for circle in self.circles:
-            circle['center']=_rotatePoint(circle['center'], degrees)
-            circle['end']=_rotatePoint(circle['end'], degrees)
+    def setAnchor(self, anchor_point):
+        # change the position of the texts, graphics and pads
+        _transformPoints(self._getPoints(), offset=(-anchor_point[0], -anchor_point[1]))
+        self.invalidate()
 
-        # change arcs position
-        for arc in self.arcs:
-            arc['start']=_rotatePoint(arc['start'], degrees)
-            arc['end']=_rotatePoint(arc['end'], degrees)
+        # change models
+        _transformPoints([model['pos'] for model in self.models],
+                         offset=(-anchor_point[0]/25.4, anchor_point[1]/25.4))
 
-        # change pads positions
-        for pad in self.pads:
-            pad['pos']=_rotatePoint(pad['pos'], degrees)
+    def rotateFootprint(self, degrees):
+        # change the position of the texts, graphics and pads, the custom
+        # pad primitives are relative to the pad and rotate with it
+        _transformPoints(self._getPoints(), degrees)
+        self.invalidate()
 
         # change models
+        _transformPoints([model['pos'] for model in self.models], -degrees)
         for model in self.models:
-            model['pos']=_rotatePoint(model['pos'], -degrees)
             model['rotate']['z']=model['rotate']['z']-degrees
 
     def filterLines(self, layer):
-        lines = []
-        for line in self.lines:
-            if line['layer'] == layer:
-                lines.append(line)
-
-        return lines
+        return list(self._getLayers()['lines'].get(layer, ()))
 
     def filterCircles(self, layer):
-        circles = []
-        for circle in self.circles:
-            if circle['layer'] == layer:
-                circles.append(circle)
-
-        return circles
+        return list(self._getLayers()['circles'].get(layer, ()))
 
     def filterArcs(self, layer):
-        arcs = []
-        for arc in self.arcs:
-            if arc['layer'] == layer:
-                arcs.append(arc)
+        return list(self._getLayers()['arcs'].get(layer, ()))
 
-        return arcs
+    # The reference, value and user texts of a layer
+    def filterTexts(self, layer):
+        return list(self._getLayers()['texts'].get(layer, ()))
+
+    # Return a copy of the value computed by compute() for key, which is
+    # computed again when the version of the footprint changed or when
+    # elements were added or removed. The pads the value depends on are
+    # kept with it, so that their ids in the key are not reused.
+    def _memoize(self, key, compute, pads=None):
+        lists = (self.pads, self.lines, self.circles, self.arcs)
+        state = (self.version,) + tuple((id(items), len(items)) for items in lists)
+
+        entry = self._geometry.get(key)
+        if entry is None or entry[0] != state:
+            entry = (state, compute(), pads)
+            self._geometry[key] = entry
+
+        return copy(entry[1])
 
     # Return the geometric bounds for a given layer
     # Includes lines, arcs, circles
     def geometricBoundingBox(self, layer):
+        return self._memoize(('geometry', layer), lambda: self._geometricBoundingBox(layer))
+
+    def _geometricBoundingBox(self, layer):
 
         bb = BoundingBox()
 
@@ -661,35 +880,8 @@ class KicadMod(object):
         # Add all arcs
         arcs=self.filterArcs(layer)
         for c in arcs:
-            cx = c['start']['x']
-            cy = c['start']['y']
-            ex = c['end']['x']
-            ey = c['end']['y']
-
-            dx = ex - cx
-            dy = ey - cy
-
-            r = math.sqrt(dx*dx + dy*dy)
-
-            dalpha=1
-            alphaend=c['angle']
-            if math.fabs(alphaend)<1:
-                dalpha=math.fabs(alphaend)/5
-            if alphaend<0:
-                dalpha=-dalpha
-            if math.fabs(alphaend)>0:
-                a=0
-                c0=[ ex - cx, ey - cy ]
-                #print("c0 = ",c0)
-                while (alphaend>0 and a<=alphaend) or (alphaend<0 and a>=alphaend):
-                    c1=[0,0]
-                    c1[0]=math.cos(a/180*3.1415)*c0[0]-math.sin(a/180*3.1415)*c0[1]
-                    c1[1]=math.sin(a/180*3.1415)*c0[0]+math.cos(a/180*3.1415)*c0[1]
-
-                    bb.addPoint(cx + c1[0], cy + c1[1])
-                    a=a+dalpha
-
-            bb.addPoint(ex, None)
+            for p in _arcPoints(c['start'], c['end'], c['angle']):
+                bb.addPoint(p['x'], p['y'])
 
         return bb
 
@@ -707,6 +899,19 @@ class KicadMod(object):
 
         return pads
 
+    # The SpatialIndex of the pads, rebuilt when pads are added or removed
+    def getPadIndex(self):
+        if self._pad_index is None or len(self._pad_index.items) != len(self.pads):
+            self._pad_index = SpatialIndex(self.pads, _padBounds)
+
+        return self._pad_index
+
+    # The pads which may be within the given distance of a box, in the order
+    # of the pads
+    def padsNear(self, xmin, ymin, xmax, ymax, distance=0):
+        return self.getPadIndex().query(xmin - distance, ymin - distance,
+                                        xmax + distance, ymax + distance)
+
     def filterPads(self, pad_type):
         pads = []
         for pad in self.pads:
@@ -725,12 +930,15 @@ class KicadMod(object):
         return bb.center
 
     def padsBounds(self, pads=None):
-
-        bb = BoundingBox()
-
         if pads == None:
             pads = self.pads
 
+        return self._memoize(('pads', tuple(map(id, pads))), lambda: self._padsBounds(pads), pads)
+
+    def _padsBounds(self, pads):
+
+        bb = BoundingBox()
+
         for pad in pads:
             pos = pad['pos']
             bb.addPoint(pos['x'], pos['y'])
@@ -738,12 +946,15 @@ class KicadMod(object):
         return bb
 
     def overpadsBounds(self, pads=None):
-
-        bb = BoundingBox()
-
         if pads == None:
             pads = self.pads
 
+        return self._memoize(('overpads', tuple(map(id, pads))), lambda: self._overpadsBounds(pads), pads)
+
+    def _overpadsBounds(self, pads):
+
+        bb = BoundingBox()
+
         for pad in pads:
             pos = pad['pos']
             px = pos['x']
@@ -786,8 +997,14 @@ class KicadMod(object):
                         points.append(_movePoint(e, {'x': +w/2, 'y': -w/2}))
                     elif p['type'] == 'gr_arc':
                         # Add arc points
-                        # TODO
-                        pass
+                        c = _rotatePoint(p['start'], angle)
+                        s = _rotatePoint(p['end'], angle)
+                        w = p['width']
+                        for a in _arcPoints(c, s, p['angle']):
+                            points.append(_movePoint(a, {'x': -w/2, 'y': -w/2}))
+                            points.append(_movePoint(a, {'x': -w/2, 'y': +w/2}))
+                            points.append(_movePoint(a, {'x': +w/2, 'y': +w/2}))
+                            points.append(_movePoint(a, {'x': +w/2, 'y': -w/2}))
                     elif p['type'] == 'gr_circle':
                         # Add circle points
                         c = _rotatePoint(p['center'], angle)
@@ -996,6 +1213,9 @@ class KicadMod(object):
         se.endGroup(newline=True)
 
     def save(self, filename=None):
+        if self.fields is not None:
+            raise RuntimeError("footprint '{name}' was only partially loaded and can not be saved".format(name=self.name))
+
         if not filename:
             filename = self.filename
 
@@ -79,12 +79,19 @@ class Rule(KLCRule):
 
         module = self.module
 
+        # only the pads close to a graph are tested, with a margin larger
+        # than the clearance of 0.075mm
+        margin = 0.1
+
         for graph in (self.f_silk + self.b_silk):
             if 'angle' in graph:
                 #TODO
                 pass
             elif 'center' in graph:
-                for pad in module.pads:
+                cx = graph['center']['x']
+                cy = graph['center']['y']
+                r = math.sqrt((graph['end']['x'] - cx)**2 + (graph['end']['y'] - cy)**2)
+                for pad in module.padsNear(cx - r, cy - r, cx + r, cy + r, margin):
                     padComplex = complex(pad['pos']['x'], pad['pos']['y'])
                     padOffset = 0 + 0j
                     if 'offset' in pad['drill']:
@@ -121,7 +128,9 @@ class Rule(KLCRule):
                         if edgesInside and edgesOutside:
                             self.intersections.append({'pad':pad, 'graph':graph})
             else:
-                for pad in module.pads:
+                xs = (graph['start']['x'], graph['end']['x'])
+                ys = (graph['start']['y'], graph['end']['y'])
+                for pad in module.padsNear(min(xs), min(ys), max(xs), max(ys), margin):
 
                     # Skip checks on NPTH and Connect holes
                     if pad['type'] in ['np_thru_hole', 'connect']:
@@ -266,6 +275,7 @@ class Rule(KLCRule):
                 if self.checkReference():
                     ref['value'] = 'REF**'
                     ref['layer'] = 'F.SilkS'
+                    module.invalidate()
                     ref['font']['width'] = KLC_TEXT_WIDTH
                     ref['font']['height'] = KLC_TEXT_HEIGHT
                     ref['font']['thickness'] = KLC_TEXT_THICKNESS
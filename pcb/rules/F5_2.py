@@ -232,6 +232,7 @@ class Rule(KLCRule):
             self.info("Fixing 'Value' text on F.Fab layer")
             module.value['value'] = module.name
             module.value['layer'] = 'F.Fab'
+            module.invalidate()
             module.value['font']['height'] = KLC_TEXT_SIZE
             module.value['font']['width'] = KLC_TEXT_SIZE
             module.value['font']['thickness'] = KLC_TEXT_THICKNESS
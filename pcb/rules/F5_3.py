@@ -97,49 +97,63 @@ class Rule(KLCRule):
             return None
 
 
-    def isClosed(self, layer):
-      def isSame(p1, p2, tolerance):
-        s = abs(p1['x'] - p2['x']) <= tolerance and abs(p1['y'] - p2['y']) <= tolerance
-        return s
-
-      # no line is considered as closed
-      if len(layer) == 0:
-        return []
-
-      # clone the lines, so we can remove them from the list
-      lines = layer[0:]
-      curr_line = lines.pop()
-      curr_point = getStartPoint(curr_line)
-      end_point = getEndPoint(curr_line)
-      tolerance = 0
-
-      while len(lines) > 0:
-        tolerance = 0
-        match = False
-        for line in lines:
-          if 'angle' in line or 'angle' in curr_line:
-            tolerance = 0.01
-          if isSame(curr_point, getStartPoint(line), tolerance):
-            curr_line = line
-            curr_point = getEndPoint(line)
-            lines.remove(line)
-            match = True
-            break
-          if isSame(curr_point, getEndPoint(line), tolerance):
-            curr_line = line
-            curr_point = getStartPoint(line)
-            lines.remove(line)
-            match = True
-            break
-        # we should hit a continue
-        # if now, that means no line connects
-        if not match:
-          return [curr_line]
-      # now check the if the last points match
-      if isSame(curr_point, end_point, tolerance):
-        return []
-      else:
-        return [curr_line]
+    def findGaps(self, layer):
+        """
+        Find the gaps in the courtyard outline of a layer in a single pass.
+        The endpoints are snapped to the courtyard grid, which also absorbs
+        the rounding errors of the computed arc endpoints. Return the lines
+        with an unconnected endpoint and, for each closed outline which is
+        not connected to the first line of the layer, its first line.
+        """
+        def vertex(point):
+            return (int(round(point['x'] / KLC_CRTYD_GRID)),
+                    int(round(point['y'] / KLC_CRTYD_GRID)))
+
+        # vertex -> number of line ends at the vertex, even everywhere for
+        # closed outlines
+        degree = {}
+        # vertex -> a vertex of the same outline (union-find)
+        parent = {}
+
+        def find(v):
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        ends = []
+        for graph in layer:
+            start = vertex(getStartPoint(graph))
+            end = vertex(getEndPoint(graph))
+            ends.append((start, end))
+
+            for v in (start, end):
+                degree[v] = degree.get(v, 0) + 1
+                parent.setdefault(v, v)
+
+            parent[find(start)] = find(end)
+
+        unconnected = []
+        # outline -> its first line, and whether it is open
+        outlines = {}
+        for graph, (start, end) in zip(layer, ends):
+            is_open = degree[start] % 2 == 1 or degree[end] % 2 == 1
+            if is_open:
+                unconnected.append(graph)
+
+            root = find(start)
+            if root not in outlines:
+                outlines[root] = [graph, is_open]
+            elif is_open:
+                outlines[root][1] = True
+
+        separate = []
+        if outlines:
+            first = find(ends[0][0])
+            separate = [graph for root, (graph, is_open) in outlines.items()
+                        if root != first and not is_open]
+
+        return unconnected, separate
 
     def check(self):
         """
@@ -164,6 +178,7 @@ class Rule(KLCRule):
         self.bad_grid  = []
         self.bad_width = []
         self.unconnected = []
+        self.separate = []
 
         self.fCourtyard = module.filterGraphs('F.CrtYd')
         self.bCourtyard = module.filterGraphs('B.CrtYd')
@@ -179,8 +194,10 @@ class Rule(KLCRule):
 
 
         # Check for intersecting lines
-        self.unconnected.extend(self.isClosed(self.fCourtyard))
-        self.unconnected.extend(self.isClosed(self.bCourtyard))
+        for layer in (self.fCourtyard, self.bCourtyard):
+            unconnected, separate = self.findGaps(layer)
+            self.unconnected.extend(unconnected)
+            self.separate.extend(separate)
 
 
         # Check for elements that are not on the grid
@@ -229,16 +246,22 @@ class Rule(KLCRule):
                 self.errorExtra(graphItemString(bad, layer=True, width=False))
 
         # Check that courtyard is closed
-        if len(self.unconnected) > 0:
+        if len(self.unconnected) > 0 or len(self.separate) > 0:
             self.error("Courtyard must be closed.")
+        if len(self.unconnected) > 0:
             self.errorExtra("The following lines have unconnected endpoints")
             for bad in self.unconnected:
                 self.errorExtra(graphItemString(bad, layer=True, width=False))
+        if len(self.separate) > 0:
+            self.errorExtra("The following lines start outlines separate from the courtyard")
+            for bad in self.separate:
+                self.errorExtra(graphItemString(bad, layer=True, width=False))
 
         return any([
             len(self.bad_width) > 0,
             len(self.bad_grid) > 0,
-            len(self.unconnected) > 0
+            len(self.unconnected) > 0,
+            len(self.separate) > 0
             ])
 
     def fix(self):
@@ -18,6 +18,8 @@ class Rule(KLCRule):
         missing_layer_errors = []
         extra_layer_errors = []
 
+        pad_ids = set(id(pad) for pad in pads)
+
         for pad in pads:
             layers = pad['layers']
 
@@ -66,8 +68,11 @@ class Rule(KLCRule):
                     p_right = p_x + p_w/2.
                     p_bottom = p_y - p_h/2.
                     p_top = p_y + p_h/2.
-                    # Look for a stencil pad
-                    for stencil_pad in pads:
+                    # Look for a stencil pad, among the pads overlapping
+                    # this one
+                    for stencil_pad in self.module.padsNear(p_left, p_bottom, p_right, p_top):
+                        if id(stencil_pad) not in pad_ids:
+                            continue
                         # TODO: Support non-rectangular and rotated stencil
                         # openings.
                         if (stencil_pad['shape'] != 'rect'
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the KicadMod class
+
+example of use: python -m unittest test_kicad_mod
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+sys.path.insert(0, os.path.join(here, '..', 'common'))
+
+from kicad_mod import KicadMod
+
+# texts and models are interleaved with other elements
+FOOTPRINT = """(module Test (layer F.Cu) (tedit 5A02FF57)
+  (descr "test footprint")
+  (tags "test")
+  (attr smd)
+  (fp_text reference REF** (at 0 -2) (layer F.SilkS)
+    (effects (font (size 1 1) (thickness 0.15)))
+  )
+  (fp_line (start 0 0) (end 1 0) (layer F.SilkS) (width 0.12))
+  (fp_text value Test (at 0 2) (layer F.Fab)
+    (effects (font (size 1 1) (thickness 0.15)))
+  )
+  (fp_line (start 1 0) (end 1 1) (layer F.SilkS) (width 0.12))
+  (fp_text user %R (at 0 0) (layer F.Fab)
+    (effects (font (size 1 1) (thickness 0.15)))
+  )
+  (model a.wrl (at (xyz 0 0 0)) (scale (xyz 1 1 1)) (rotate (xyz 0 0 0)))
+  (pad 1 smd rect (at 0 0) (size 1 1) (layers F.Cu F.Paste F.Mask))
+  (model b.wrl (at (xyz 0 0 0)) (scale (xyz 1 1 1)) (rotate (xyz 0 0 0)))
+)
+"""
+
+class PartialLoadingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'Test.kicad_mod')
+        with open(self.filename, 'w') as f:
+            f.write(FOOTPRINT)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_texts(self):
+        partial = KicadMod(self.filename, fields=['fp_text'])
+        full = KicadMod(self.filename)
+        self.assertEqual(partial.reference, full.reference)
+        self.assertEqual(partial.value, full.value)
+        self.assertEqual(partial.userText, full.userText)
+        self.assertEqual(len(partial.userText), 1)
+
+    def test_models(self):
+        partial = KicadMod(self.filename, fields=['model'])
+        self.assertEqual([model['file'] for model in partial.models], ['a.wrl', 'b.wrl'])
+
+    def test_header(self):
+        partial = KicadMod(self.filename, fields=['descr', 'tags', 'attr'])
+        self.assertEqual(partial.description, 'test footprint')
+        self.assertEqual(partial.tags, 'test')
+        self.assertEqual(partial.attribute, 'smd')
+        self.assertEqual(partial.lines, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
 
 import sys
-import shlex
+import os
 import re
 
+common = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'common'))
+
+if not common in sys.path:
+    sys.path.append(common)
+
+from eeschema import splitLine
+
 
 def ensure_quoted(s):
     """
@@ -54,11 +61,7 @@ class Component(object):
                 continue
 
             line = line.replace('\n', '')
-            s = shlex.shlex(line)
-            s.whitespace_split = True
-            s.commenters = ''
-            s.quotes = '"'
-            line = list(s)
+            line = splitLine(line)
 
             # select the keys list and default values array
             if line[0] in self._KEYS:
@@ -115,11 +118,7 @@ class Sheet(object):
         self.fields = []
         for line in data:
             line = line.replace('\n', '')
-            s = shlex.shlex(line)
-            s.whitespace_split = True
-            s.commenters = ''
-            s.quotes = '"'
-            line = list(s)
+            line = splitLine(line)
             # select the keys list and default values array
             if line[0] in self._KEYS:
                 key_list = self._KEYS[line[0]]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the loading of symbol libraries with SchLib.
+
+The largest of the given libraries are loaded, and all their symbols
+parsed, with the line tokenizer of common/eeschema.py and with the shlex
+based tokenizer it replaced, after checking that both split every line the
+same way.
+
+example of use: ./benchmark_schlib.py ~/kicad/library/*.lib --largest 5
+"""
+
+import argparse
+import shlex
+import time
+import sys, os
+
+common = os.path.abspath(os.path.join(sys.path[0], '..','common'))
+
+if not common in sys.path:
+    sys.path.append(common)
+
+import schlib
+from eeschema import splitLine
+
+# enable windows wildcards
+from glob import glob
+
+def shlexSplitLine(line):
+    s = shlex.shlex(line)
+    s.whitespace_split = True
+    s.commenters = ''
+    s.quotes = '"'
+    return list(s)
+
+# load the libraries and parse every symbol, SchLib only reads the names
+# and aliases of the symbols until their content is used
+def load(libfiles, split):
+    schlib.splitLine = split
+    try:
+        libs = [schlib.SchLib(libfile) for libfile in libfiles]
+        for lib in libs:
+            for component in lib.components:
+                component.pins
+        return libs
+    finally:
+        schlib.splitLine = splitLine
+
+def run(libfiles, split, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        load(libfiles, split)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+parser = argparse.ArgumentParser(description='Benchmark the loading of the largest symbol libraries')
+parser.add_argument('libfiles', nargs='+')
+parser.add_argument('--largest', help='number of libraries to load, the largest ones are taken (default = 5)', type=int, default=5)
+parser.add_argument('-n', '--repeat', help='number of runs, the best one is reported (default = 3)', type=int, default=3)
+
+args = parser.parse_args()
+
+libfiles = []
+for libfile in args.libfiles:
+    libfiles += glob(libfile)
+
+if len(libfiles) == 0:
+    print("File argument invalid: {f}".format(f=args.libfiles))
+    sys.exit(1)
+
+libfiles = sorted(libfiles, key=os.path.getsize, reverse=True)[:args.largest]
+
+# both tokenizers must agree on every line
+for libfile in libfiles:
+    with open(libfile) as f:
+        for line in f:
+            line = line.replace('\n', '')
+            if splitLine(line) != shlexSplitLine(line):
+                print("splitLine differs from shlex in '{f}' for: {l}".format(f=libfile, l=line))
+                sys.exit(1)
+
+n_components = sum(len(lib.components) for lib in load(libfiles, splitLine))
+size = sum(os.path.getsize(f) for f in libfiles) / (1024 * 1024)
+
+print("{n} libraries, {c} symbols, {s:.2f} MB".format(n=len(libfiles), c=n_components, s=size))
+
+t_shlex = run(libfiles, shlexSplitLine, args.repeat)
+t_split = run(libfiles, splitLine, args.repeat)
+
+print("shlex:     {t:.3f} s".format(t=t_shlex))
+print("splitLine: {t:.3f} s".format(t=t_split))
+print("speedup:   {x:.2f}x".format(x=t_shlex / t_split))
@@ -2,7 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import io
+import multiprocessing
 import sys, os
+from contextlib import redirect_stdout, redirect_stderr
 
 common = os.path.abspath(os.path.join(sys.path[0], '..','common'))
 
@@ -12,28 +15,21 @@ if not common in sys.path:
 from schlib import *
 
 from print_color import *
-import re
 from rules import __all__ as all_rules
-from rules import *
 from rules.rule import KLCRule
-from rulebase import logError
+from klc_check import add_check_arguments, select_components, select_rules, check_components
+from rulebase import ErrorLog
+from footprint_index import getFootprintIndex
 
 #enable windows wildcards
 from glob import glob
 
 parser = argparse.ArgumentParser(description='Checks KiCad library files (.lib) against KiCad Library Convention (KLC) rules. You can find the KLC at http://kicad-pcb.org/libraries/klc/')
 parser.add_argument('libfiles', nargs='+')
-parser.add_argument('-c', '--component', help='check only a specific component (implicitly verbose)', action='store')
-parser.add_argument('-p', '--pattern', help='Check multiple components by matching a regular expression', action='store')
-parser.add_argument('-r','--rule',help='Select a particular rule (or rules) to check against (default = all rules). Use comma separated values to select multiple rules. e.g. "-r 3.1,EC02"')
-parser.add_argument('-e','--exclude',help='Exclude a particular rule (or rules) to check against. Use comma separated values to select multiple rules. e.g. "-e 3.1,EC02"')
 parser.add_argument('--fix', help='fix the violations if possible', action='store_true')
 parser.add_argument('--nocolor', help='does not use colors to show the output', action='store_true')
-parser.add_argument('-v', '--verbose', help='Enable verbose output. -v shows brief information, -vv shows complete information', action='count')
-parser.add_argument('-s', '--silent', help='skip output for symbols passing all checks', action='store_true')
-parser.add_argument('-l', '--log', help='Path to JSON file to log error information')
-parser.add_argument('-w', '--nowarnings', help='Hide warnings (only show errors)', action='store_true')
-parser.add_argument('--footprints', help='Path to footprint libraries (.pretty dirs). Specify with e.g. "~/kicad/footprints/"')
+parser.add_argument('-j', '--jobs', help='number of processes checking the libraries in parallel (default = 1, 0 = number of CPUs)', type=int, default=1)
+add_check_arguments(parser)
 
 args = parser.parse_args()
 
@@ -57,118 +53,167 @@ if args.exclude:
 else:
     excluded_rules = None
 
-rules = []
-
-for r in all_rules:
-    r_name = r.replace('_', '.')
-    if selected_rules == None or r_name in selected_rules:
-        if excluded_rules == None or r_name not in excluded_rules:
-            rules.append(globals()[r].Rule)
+rules = select_rules(selected_rules, excluded_rules)
 
 #grab list of libfiles (even on windows!)
 libfiles = []
 
-if len(all_rules)<=0:
-    printer.red("No rules selected for check!")
-    sys.exit(1)
-else:
-    if (verbosity>2):
-        printer.regular("checking rules:")
-        for rule in all_rules:
-            printer.regular("  - "+str(rule))
-        printer.regular("")
-
 for libfile in args.libfiles:
     libfiles += glob(libfile)
 
-if len(libfiles) == 0:
-    printer.red("File argument invalid: {f}".format(f=args.libfiles))
-    sys.exit(1)
+# True if the component name is selected by -c and -p, None when all the
+# components are checked
+selectedComponent = select_components(args)
 
-exit_code = 0
-
-for libfile in libfiles:
-    lib = SchLib(libfile)
-
-    # Remove .lib from end of name
-    lib_name = os.path.basename(libfile)[:-4]
-
-    n_components = 0
+# number of components checked by one task when a library is split across
+# the worker processes
+CHUNK_SIZE = 100
 
+# check a library, the whole library is checked (and saved if fixed) unless
+# blocks holds the raw lines of a part of its components, read beforehand
+# by splitLibraries, with start the index of the first one
+# returns the increment of the exit code and the violations to be logged
+def checkLibrary(libfile, start=0, blocks=None, documentation=None):
     # Print library name
-    if len(libfiles) > 1:
+    if start == 0 and len(libfiles) > 1:
         printer.purple('Library: %s' % libfile)
 
-    n_allviolations=0
-
-    for component in lib.components:
-
-        #simple match
-        match = True
-        if args.component:
-            match = match and args.component.lower() == component.name.lower()
+    # the components of the chunk are checked in library order, like when
+    # the whole library is checked
+    if blocks is not None:
+        components = (Component(component_data, comments, libfile, documentation)
+                      for component_data, comments in blocks)
+        exit_code, n_allviolations, log_entries = check_components(libfile, components, None, rules, args, printer)
 
-        #regular expression match
-        if args.pattern:
-            match = match and re.search(args.pattern, component.name, flags=re.IGNORECASE)
+        if not args.log:
+            log_entries = []
 
-        if not match: continue
+        return exit_code, log_entries
 
-        n_components += 1
+    # only the selected components are parsed when the library is not saved
+    if selectedComponent and not args.fix:
+        components = SchLib.iter_components(libfile, selectedComponent)
+        exit_code, n_allviolations, log_entries = check_components(libfile, components, None, rules, args, printer)
 
-        # check the rules
-        n_violations = 0
+        if not args.log:
+            log_entries = []
 
-        first = True
+        return exit_code, log_entries
 
-        for rule in rules:
-            rule = rule(component)
-
-            if args.footprints:
-                rule.footprints_dir = args.footprints
-            else:
-                rule.footprints_dir = None
-
-            if verbosity > 2:
-                printer.white("checking rule" + rule.name)
-
-            rule.check()
-
-            if args.nowarnings and not rule.hasErrors():
-                continue
-
-            if rule.hasOutput():
-                if first:
-                    printer.green("Checking symbol '{sym}':".format(sym=component.name))
-                    first = False
-
-                printer.yellow("Violating " + rule.name, indentation=2)
-                rule.processOutput(printer, verbosity, args.silent)
-
-            # Specifically check for errors
-            if rule.hasErrors():
-                n_violations += rule.errorCount
-
-                if args.log:
-                    logError(args.log, rule.name, lib_name, component.name)
+    lib = SchLib(libfile)
 
-                if args.fix:
-                    rule.fix()
-                    rule.processOutput(printer, verbosity, args.silent)
-                    rule.recheck()
+    names = None
 
-        # No messages?
-        if first:
-            if not args.silent:
-                printer.green("Checking symbol '{sym}' - No errors".format(sym=component.name))
+    if selectedComponent:
+        names = [component.name for component in lib.components if selectedComponent(component.name)]
 
-        # check the number of violations
-        if n_violations > 0:
-            exit_code += 1
-        n_allviolations=n_allviolations+n_violations
+    exit_code, n_allviolations, log_entries = check_components(libfile, lib.components, names, rules, args, printer)
 
     if args.fix and n_allviolations > 0:
         lib.save()
         printer.green("saved '{file}' with fixes for {n_violations} violations.".format(file=libfile, n_violations=n_allviolations))
 
-sys.exit(exit_code);
+    if not args.log:
+        log_entries = []
+
+    return exit_code, log_entries
+
+# run checkLibrary in a worker process, the output is returned instead of
+# printed so that the main process can print it in the order of the libraries
+def checkLibraryBuffered(task):
+    libfile, start, blocks, documentation, messages = task
+    out = io.StringIO()
+    err = io.StringIO()
+    with redirect_stdout(out), redirect_stderr(err):
+        sys.stderr.write(messages)
+        result = checkLibrary(libfile, start, blocks, documentation)
+    return out.getvalue(), err.getvalue(), result
+
+# split the libraries in tasks of at most CHUNK_SIZE components, by their
+# index in the library. The library and its documentation are read once
+# here and each task gets the lines of its components only. Libraries are
+# kept whole when fixing because they are saved at the end of the check and
+# when only some components are selected, as they are streamed
+def splitLibraries(libfiles):
+    for libfile in libfiles:
+        blocks = None
+        if not args.fix and not selectedComponent:
+            blocks = SchLib.readComponentBlocks(libfile)
+
+        # the errors of the library are reported by the worker
+        if blocks is None:
+            yield libfile, 0, None, None, ''
+            continue
+
+        # the messages about the documentation are printed once, with the
+        # first part of the library
+        messages = io.StringIO()
+        with redirect_stderr(messages):
+            documentation = Documentation(SchLib.libToDcmFilename(libfile))
+        messages = messages.getvalue()
+
+        start = 0
+        while True:
+            yield libfile, start, blocks[start:start + CHUNK_SIZE], documentation, messages
+            messages = ''
+            start += CHUNK_SIZE
+            if start >= len(blocks):
+                break
+
+def checkLibraries(libfiles, jobs):
+    if jobs == 1:
+        for libfile in libfiles:
+            yield checkLibrary(libfile)
+        return
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for out, err, result in pool.imap(checkLibraryBuffered, splitLibraries(libfiles)):
+            sys.stdout.write(out)
+            sys.stderr.write(err)
+            yield result
+    finally:
+        pool.terminate()
+
+if __name__ == '__main__':
+    if len(all_rules)<=0:
+        printer.red("No rules selected for check!")
+        sys.exit(1)
+    else:
+        if (verbosity>2):
+            printer.regular("checking rules:")
+            for rule in all_rules:
+                printer.regular("  - "+str(rule))
+            printer.regular("")
+
+    if len(libfiles) == 0:
+        printer.red("File argument invalid: {f}".format(f=args.libfiles))
+        sys.exit(1)
+
+    jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
+
+    # a library given twice must not be saved by two workers at the same time
+    if args.fix and len(set(os.path.realpath(f) for f in libfiles)) < len(libfiles):
+        jobs = 1
+
+    # the footprint libraries are listed once, before the worker processes
+    # are started
+    if args.footprints and os.path.isdir(args.footprints):
+        getFootprintIndex(args.footprints, jobs, args.footprints_snapshot)
+
+    exit_code = 0
+
+    # violations are written to the log once all the checks are done
+    error_log = ErrorLog(args.log) if args.log else None
+
+    try:
+        for lib_exit_code, log_entries in checkLibraries(libfiles, jobs):
+            exit_code += lib_exit_code
+
+            for rule_name, lib_name, component_name in log_entries:
+                error_log.add(rule_name, lib_name, component_name)
+    finally:
+        if error_log:
+            error_log.write()
+
+    sys.exit(exit_code);
@@ -24,6 +24,10 @@ if not common in sys.path:
 
 from schlib import *
 from print_color import *
+from rulebase import ErrorLog
+from rules.rule import KLCRule
+from klc_check import add_check_arguments, select_components, select_rules, check_components
+from footprint_index import getFootprintIndex
 
 def ExitError( msg ):
     print(msg)
@@ -48,24 +52,50 @@ if not args.new:
 if not args.old:
     ExitError("Original file(s) not supplied")
 
-def KLCCheck(lib, component):
+# the options of checklib.py which select what is checked and how the
+# violations are reported can be given for the KLC check
+if args.check:
+    check_parser = argparse.ArgumentParser(prog='comparelibs.py --check', description="Options for the KLC check of the updated/added components")
+    add_check_arguments(check_parser)
 
-    # Wrap library in "quotes" if required
-    if " " in lib and '"' not in lib:
-        lib = '"' + lib + '"'
+    check_args = check_parser.parse_args(extra)
 
-    call = '{exe} checklib.py {lib} -c={cmp} -vv -s {nocolor}'.format(
-                exe = sys.executable,
-                lib = lib,
-                cmp = component,
-                nocolor = "--nocolor " if args.nocolor else ""
-                )
+    # same output as checklib.py -vv -s
+    check_args.verbose = 2
+    check_args.silent = True
+    check_args.fix = False
 
-    # Pass extra arguments to checklib script
-    if len(extra) > 0:
-        call += ' '.join([str(e) for e in extra])
+    KLCRule.verbosity = check_args.verbose
 
-    return os.system(call)
+    check_rules = select_rules(check_args.rule.split(',') if check_args.rule else None,
+                               check_args.exclude.split(',') if check_args.exclude else None)
+
+    selected_component = select_components(check_args)
+
+    # the footprint libraries are listed once for all the checks
+    if check_args.footprints and os.path.isdir(check_args.footprints):
+        getFootprintIndex(check_args.footprints, 1, check_args.footprints_snapshot)
+
+    error_log = ErrorLog(check_args.log) if check_args.log else None
+else:
+    error_log = None
+
+# check the components with the given names (None = all) of a loaded library,
+# limited to the ones selected by -c and -p
+# returns the number of components with errors
+def KLCCheck(lib, names):
+    if selected_component:
+        if names is None:
+            names = [component.name for component in lib.components]
+        names = [name for name in names if selected_component(name)]
+
+    n_failed, n_violations, log_entries = check_components(lib.filename, lib.components, names, check_rules, check_args, printer)
+
+    if error_log:
+        for rule_name, lib_name, component_name in log_entries:
+            error_log.add(rule_name, lib_name, component_name)
+
+    return n_failed
 
 printer = PrintColor(use_color = not args.nocolor)
 
@@ -112,11 +142,8 @@ for lib_name in new_libs:
             printer.light_green("Created library '{lib}'".format(lib=lib_name))
 
         # Check all the components!
-        for cmp in new_lib.components:
-
-            if args.check:
-                if not KLCCheck(lib_path, cmp.name) == 0:
-                    errors += 1
+        if args.check:
+            errors += KLCCheck(new_lib, None)
 
 
         continue
@@ -159,7 +186,7 @@ for lib_name in new_libs:
                     lib=lib_name, name=cmp, alias_info=alias_info))
 
             if args.check:
-                if not KLCCheck(lib_path, cmp) == 0:
+                if not KLCCheck(new_lib, [cmp]) == 0:
                     errors += 1
 
             continue
@@ -167,8 +194,9 @@ for lib_name in new_libs:
         if new_cmp[cmp]['alias_of'] != old_cmp[cmp]['alias_of'] and args.verbose:
             printer.white("Changed alias state of '{lib}:{name}'".format(lib=lib_name, name=cmp))
 
-        chk_new = new_cmp[cmp]['cmp'].checksum
-        chk_old = old_cmp[cmp]['cmp'].checksum
+        # reformatting and reordering the library does not change a component
+        chk_new = new_cmp[cmp]['cmp'].getCanonicalHash()
+        chk_old = old_cmp[cmp]['cmp'].getCanonicalHash()
 
         if not chk_old == chk_new:
             if args.verbose:
@@ -204,7 +232,7 @@ for lib_name in new_libs:
                         lib=lib_name, name=cmp, alias_info=alias_info))
 
             if args.check:
-                if not KLCCheck(lib_path, cmp) == 0:
+                if not KLCCheck(new_lib, [cmp]) == 0:
                     errors += 1
 
     for cmp in old_cmp:
@@ -228,5 +256,8 @@ for lib_name in old_libs:
         if args.design_breaking_changes:
             design_breaking_changes += 1
 
+if error_log:
+    error_log.write()
+
 # Return the number of errors found ( zero if --check is not set )
 sys.exit(errors + design_breaking_changes)
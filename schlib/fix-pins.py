@@ -60,37 +60,37 @@ class CheckComponent(object):
 
         # pins length have to be multiple of 50mil
         for pin in component.pins:
-            if (int(pin['length']) % 50) != 0:
+            if (pin.length % 50) != 0:
                 return
 
         # pins posx and posy have to be multiple of 50mil
         for pin in component.pins:
-            if (int(pin['posx']) % 50) != 0 or (int(pin['posy']) % 50) != 0:
+            if (pin.posx % 50) != 0 or (pin.posy % 50) != 0:
                 return
 
         # check if at least one pin is wrong in each direction
         if self.pinsL_count > 0 and self.pinsR_count > 0:
             for pin in self.pinsL:
-                posx = int(pin['posx'])
+                posx = pin.posx
                 if (posx % 100) != 0:
                     self.need_fix_L = True
                     break
 
             for pin in self.pinsR:
-                posx = int(pin['posx'])
+                posx = pin.posx
                 if (posx % 100) != 0:
                     self.need_fix_R = True
                     break
 
         if self.pinsU_count > 0 and self.pinsD_count > 0:
             for pin in self.pinsU:
-                posy = int(pin['posy'])
+                posy = pin.posy
                 if (posy % 100) != 0:
                     self.need_fix_U = True
                     break
 
             for pin in self.pinsD:
-                posy = int(pin['posy'])
+                posy = pin.posy
                 if (posy % 100) != 0:
                     self.need_fix_D = True
                     break
@@ -116,8 +116,8 @@ def resize_component_pins(component):
     # case (1)
     if component.pinsL_count > 0 and component.pinsR_count == 0:
         for pin in component.pinsL:
-            posx = int(pin['posx'])
-            length = int(pin['length'])
+            posx = pin.posx
+            length = pin.length
 
             if (posx % 100) != 0:
                 if length <= 100:
@@ -132,8 +132,8 @@ def resize_component_pins(component):
     # case (2)
     if component.pinsR_count > 0 and component.pinsL_count == 0:
         for pin in component.pinsR:
-            posx = int(pin['posx'])
-            length = int(pin['length'])
+            posx = pin.posx
+            length = pin.length
 
             if (posx % 100) != 0:
                 if length <= 100:
@@ -148,8 +148,8 @@ def resize_component_pins(component):
     # case (3)
     if component.pinsU_count > 0 and component.pinsD_count == 0:
         for pin in component.pinsU:
-            posy = int(pin['posy'])
-            length = int(pin['length'])
+            posy = pin.posy
+            length = pin.length
 
             if (posy % 100) != 0:
                 if length <= 100:
@@ -164,8 +164,8 @@ def resize_component_pins(component):
     # case (4)
     if component.pinsD_count > 0 and component.pinsU_count == 0:
         for pin in component.pinsD:
-            posy = int(pin['posy'])
-            length = int(pin['length'])
+            posy = pin.posy
+            length = pin.length
 
             if (posy % 100) != 0:
                 if length <= 100:
@@ -180,8 +180,8 @@ def resize_component_pins(component):
     # case (5)
     if component.need_fix_L and component.need_fix_R:
         for pin in (component.pinsL + component.pinsR):
-            posx = int(pin['posx'])
-            length = int(pin['length'])
+            posx = pin.posx
+            length = pin.length
 
             if length <= 100:
                 length += 50
@@ -195,8 +195,8 @@ def resize_component_pins(component):
     # case (6)
     if component.need_fix_U and component.need_fix_D:
         for pin in (component.pinsU + component.pinsD):
-            posy = int(pin['posy'])
-            length = int(pin['length'])
+            posy = pin.posy
+            length = pin.length
 
             if length <= 100:
                 length += 50
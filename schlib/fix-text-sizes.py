@@ -25,9 +25,9 @@ class CheckComponent(object):
         
         # pin text sizes have to be 50mils
         for pin in component.pins:
-            if int(pin['name_text_size']) > 50:
+            if pin.name_text_size > 50:
                 self.pinTextsToFix.append(pin)
-            if int(pin['num_text_size']) > 50:
+            if pin.num_text_size > 50:
                 self.pinNumsToFix.append(pin)
 
         self.prerequisites_ok = True
@@ -69,13 +69,13 @@ def resize_component_fields(component):
     
     # The 2nd case that needs fixing is a pin text size over 50mils
     for pin in component.pinTextsToFix:
-        size = int(pin['name_text_size'])
+        size = pin.name_text_size
         if size != 0:
             component.resize_pin_name_text(pin)
             
     # The 3rd case that needs fixing is a pin num size over 50mils
     for pin in component.pinNumsToFix:
-        size = int(pin['num_text_size'])
+        size = pin.num_text_size
         if size != 0:
             component.resize_pin_num_text(pin)
 
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+Index of the footprint libraries (.pretty directories) found in a directory,
+shared by the rules checking the footprints of the symbols
+"""
+
+import bisect
+import json
+import os
+import re
+import sys
+from multiprocessing.pool import ThreadPool
+
+class FootprintIndex(object):
+    """
+    The footprints of the libraries of a directory, as a dict of library
+    name -> set of footprint names
+
+    With jobs > 1 the libraries are listed by several threads. With a
+    snapshot file, the libraries whose directory did not change since the
+    snapshot was written are not listed again, and the snapshot is updated.
+    """
+
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, footprints_dir, jobs=1, snapshot=None):
+        self.footprints_dir = footprints_dir
+        self.libraries = {}
+        self.filter_matcher = None
+
+        # modification time of each library directory
+        mtimes = {}
+        with os.scandir(footprints_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.pretty') and entry.is_dir():
+                    mtimes[entry.name[:-len('.pretty')]] = entry.stat().st_mtime_ns
+
+        saved = self.__readSnapshot(snapshot) if snapshot else {}
+
+        to_list = []
+        for name, mtime in mtimes.items():
+            if name in saved and saved[name]['mtime'] == mtime:
+                self.libraries[name] = set(saved[name]['footprints'])
+            else:
+                to_list.append(name)
+
+        if jobs > 1 and len(to_list) > 1:
+            pool = ThreadPool(jobs)
+            try:
+                listed = pool.map(self.__listLibrary, to_list)
+            finally:
+                pool.close()
+        else:
+            listed = [self.__listLibrary(name) for name in to_list]
+
+        self.libraries.update(zip(to_list, listed))
+
+        if snapshot and (to_list or set(saved) != set(mtimes)):
+            self.__writeSnapshot(snapshot, mtimes)
+
+    def __listLibrary(self, name):
+        footprints = set()
+        with os.scandir(os.path.join(self.footprints_dir, name + '.pretty')) as entries:
+            for entry in entries:
+                if entry.name.endswith('.kicad_mod'):
+                    footprints.add(entry.name[:-len('.kicad_mod')])
+
+        return footprints
+
+    def __readSnapshot(self, snapshot):
+        try:
+            with open(snapshot) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if data.get('version') != self.SNAPSHOT_VERSION or data.get('footprints_dir') != os.path.realpath(self.footprints_dir):
+            return {}
+
+        return data.get('libraries', {})
+
+    def __writeSnapshot(self, snapshot, mtimes):
+        data = {
+            'version': self.SNAPSHOT_VERSION,
+            'footprints_dir': os.path.realpath(self.footprints_dir),
+            'libraries': {name: {'mtime': mtimes[name], 'footprints': sorted(self.libraries[name])} for name in mtimes},
+        }
+
+        try:
+            with open(snapshot, 'w') as f:
+                json.dump(data, f)
+        except OSError as e:
+            sys.stderr.write("Could not write the footprint snapshot '{f}': {e}\n".format(f=snapshot, e=e))
+
+    def hasLibrary(self, library):
+        return library in self.libraries
+
+    def hasFootprint(self, library, footprint):
+        return footprint in self.libraries.get(library, ())
+
+    # the footprints of a library, None if there is no such library
+    def getFootprints(self, library):
+        return self.libraries.get(library)
+
+    # the FootprintFilterMatcher of the footprints, built on first use
+    def getFilterMatcher(self):
+        if self.filter_matcher is None:
+            self.filter_matcher = FootprintFilterMatcher(self)
+
+        return self.filter_matcher
+
+# The regular expression matching the same strings as a footprint filter,
+# where '*' matches any string and '?' any character (use it with fullmatch)
+def wildcardToRegex(filt):
+    regex = ''
+    for c in filt:
+        if c == '*':
+            regex += '.*'
+        elif c == '?':
+            regex += '.'
+        else:
+            regex += re.escape(c)
+
+    return regex
+
+class FootprintFilterMatcher(object):
+    """
+    Find the footprints of a FootprintIndex matched by footprint filters
+
+    Filters are matched the way KiCad does: ignoring the case, against the
+    footprint name, or against 'library:footprint' if the filter contains a
+    ':'. '*' matches any string and '?' any character, all the other
+    characters (including '[') only match themselves.
+
+    Each filter is compiled once and only tried on the names starting with
+    its literal prefix (found by binary search in the sorted names) or, if
+    it starts with a wildcard, on the names containing every trigram of its
+    longest literal part. The results are cached.
+    """
+
+    # the wildcards, which split the literal parts of a filter
+    _wildcard_re = re.compile(r'[*?]')
+
+    def __init__(self, index):
+        # lower case name -> 'library:footprint' names, for footprint names
+        # and for 'library:footprint' names
+        self.full_names = {False: {}, True: {}}
+        for library, footprints in index.libraries.items():
+            for footprint in footprints:
+                full_name = library + ':' + footprint
+                self.full_names[False].setdefault(footprint.lower(), []).append(full_name)
+                self.full_names[True].setdefault(full_name.lower(), []).append(full_name)
+
+        # sorted lower case names
+        self.names = {key: sorted(names) for key, names in self.full_names.items()}
+
+        # trigram -> set of the indexes of the names containing it, built on
+        # first use for footprint names and for 'library:footprint' names
+        self.trigrams = {}
+
+        self.cache = {}
+
+    def __trigrams(self, with_library):
+        if with_library not in self.trigrams:
+            trigrams = {}
+            for i, name in enumerate(self.names[with_library]):
+                for j in range(len(name) - 2):
+                    trigrams.setdefault(name[j:j+3], set()).add(i)
+
+            self.trigrams[with_library] = trigrams
+
+        return self.trigrams[with_library]
+
+    def __candidates(self, filt, with_library):
+        names = self.names[with_library]
+
+        prefix = self._wildcard_re.split(filt, 1)[0]
+        if prefix:
+            start = bisect.bisect_left(names, prefix)
+            end = start
+            while end < len(names) and names[end].startswith(prefix):
+                end += 1
+            return names[start:end]
+
+        literal = max(self._wildcard_re.split(filt), key=len)
+        if len(literal) < 3:
+            return names
+
+        trigrams = self.__trigrams(with_library)
+        postings = sorted((trigrams.get(literal[j:j+3], set()) for j in range(len(literal) - 2)), key=len)
+        indexes = set.intersection(*postings)
+        return [names[i] for i in sorted(indexes)]
+
+    def match(self, filt):
+        """
+        Return the set of the 'library:footprint' names matched by the
+        filter, the set must not be changed
+        """
+        if filt not in self.cache:
+            with_library = ':' in filt
+            lower = filt.lower()
+            regex = re.compile(wildcardToRegex(lower), re.DOTALL)
+
+            matches = set()
+            for name in self.__candidates(lower, with_library):
+                if regex.fullmatch(name):
+                    matches.update(self.full_names[with_library][name])
+
+            self.cache[filt] = matches
+
+        return self.cache[filt]
+
+# the indexes of this process by directory
+_indexes = {}
+
+def getFootprintIndex(footprints_dir, jobs=1, snapshot=None):
+    """
+    Return the FootprintIndex of footprints_dir, it is built on first use
+    and then shared by the whole process (and the worker processes it forks)
+    """
+    key = os.path.realpath(footprints_dir)
+
+    if key not in _indexes:
+        _indexes[key] = FootprintIndex(footprints_dir, jobs, snapshot)
+
+    return _indexes[key]
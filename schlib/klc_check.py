@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+KLC check of the components of a loaded library, shared by checklib.py and
+comparelibs.py
+"""
+
+import os
+import re
+
+from rules import __all__ as all_rules
+from rules import *
+from rules.rule import ComponentAnalysis
+
+def add_check_arguments(parser):
+    """
+    Add the options of the KLC check shared by checklib.py and
+    comparelibs.py --check to the argparse parser
+    """
+    parser.add_argument('-c', '--component', help='check only a specific component (implicitly verbose)', action='store')
+    parser.add_argument('-p', '--pattern', help='Check multiple components by matching a regular expression', action='store')
+    parser.add_argument('-r','--rule',help='Select a particular rule (or rules) to check against (default = all rules). Use comma separated values to select multiple rules. e.g. "-r 3.1,EC02"')
+    parser.add_argument('-e','--exclude',help='Exclude a particular rule (or rules) to check against. Use comma separated values to select multiple rules. e.g. "-e 3.1,EC02"')
+    parser.add_argument('-v', '--verbose', help='Enable verbose output. -v shows brief information, -vv shows complete information', action='count')
+    parser.add_argument('-s', '--silent', help='skip output for symbols passing all checks', action='store_true')
+    parser.add_argument('-l', '--log', help='Path to JSON file to log error information')
+    parser.add_argument('-w', '--nowarnings', help='Hide warnings (only show errors)', action='store_true')
+    parser.add_argument('--footprints', help='Path to footprint libraries (.pretty dirs). Specify with e.g. "~/kicad/footprints/"')
+    parser.add_argument('--footprints-snapshot', help='JSON file keeping the list of footprints between runs, only the changed footprint libraries are listed again')
+
+def select_components(options):
+    """
+    Return a function telling if a component name is selected by the -c and
+    -p options, or None when all the components are selected
+    """
+    if not options.component and not options.pattern:
+        return None
+
+    def match(name):
+        #simple match
+        if options.component and options.component.lower() != name.lower():
+            return False
+
+        #regular expression match
+        if options.pattern and not re.search(options.pattern, name, flags=re.IGNORECASE):
+            return False
+
+        return True
+
+    return match
+
+def select_rules(selected_rules=None, excluded_rules=None):
+    """
+    Return the Rule classes of the selected rules (None = all rules) which
+    are not excluded. Rules are named like 'S3.1' or 'EC02'
+    """
+    rules = []
+
+    for r in all_rules:
+        r_name = r.replace('_', '.')
+        if selected_rules == None or r_name in selected_rules:
+            if excluded_rules == None or r_name not in excluded_rules:
+                rules.append(globals()[r].Rule)
+
+    return rules
+
+def check_components(libfile, components, names, rules, options, printer):
+    """
+    Check the components of the library libfile against the rules and print
+    the violations. components can be any iterable, e.g. the components of a
+    SchLib or SchLib.iter_components()
+
+    names limits the check to the components with these names (None = all)
+    options holds the settings of checklib.py: verbose, silent, nowarnings,
+    fix and footprints
+
+    Returns the number of components with errors, the total number of
+    errors and the errors to be logged as (rule, library, component) tuples
+    """
+    verbosity = options.verbose if options.verbose else 0
+
+    # Remove .lib from end of name
+    lib_name = os.path.basename(libfile)[:-4]
+
+    if names is not None:
+        names = set(names)
+
+    n_failed = 0
+    n_allviolations = 0
+    log_entries = []
+
+    for component in components:
+
+        if names is not None and component.name not in names:
+            continue
+
+        # check the rules
+        n_violations = 0
+
+        first = True
+
+        # facts about the component shared by the rules
+        analysis = ComponentAnalysis(component)
+
+        for rule in rules:
+            rule = rule(component)
+            rule.analysis = analysis
+
+            if options.footprints:
+                rule.footprints_dir = options.footprints
+            else:
+                rule.footprints_dir = None
+
+            if verbosity > 2:
+                printer.white("checking rule" + rule.name)
+
+            rule.check()
+
+            if options.nowarnings and not rule.hasErrors():
+                continue
+
+            if rule.hasOutput():
+                if first:
+                    printer.green("Checking symbol '{sym}':".format(sym=component.name))
+                    first = False
+
+                printer.yellow("Violating " + rule.name, indentation=2)
+                rule.processOutput(printer, verbosity, options.silent)
+
+            # Specifically check for errors
+            if rule.hasErrors():
+                n_violations += rule.errorCount
+
+                log_entries.append((rule.name, lib_name, component.name))
+
+                if options.fix:
+                    rule.fix()
+                    analysis.invalidate()
+                    rule.processOutput(printer, verbosity, options.silent)
+                    rule.recheck()
+
+        # No messages?
+        if first:
+            if not options.silent:
+                printer.green("Checking symbol '{sym}' - No errors".format(sym=component.name))
+
+        # check the number of violations
+        if n_violations > 0:
+            n_failed += 1
+        n_allviolations += n_violations
+
+    return n_failed, n_allviolations, log_entries
@@ -12,12 +12,11 @@ parser.add_argument('destination', help='The path to the destination library')
 parser.add_argument('--create', help='Creates the destination library if does not exists', action='store_true')
 args = parser.parse_args()
 
-# check if the component exists in the source
+# check if the component exists in the source, aliases are not looked up so
+# that an alias does not move the whole component by mistake
 src_lib = SchLib(args.source)
-for component in src_lib.components:
-    if args.name == component.name:
-        break
-else:
+component = src_lib.getComponentByName(args.name, aliases=False)
+if component is None:
     print('Error: Cannot find the component in the source library.')
     sys.exit(1)
 
@@ -29,10 +28,10 @@ except FileNotFoundError:
     sys.exit(1)
 
 # check if the component exists in the destination
-for comp in dst_lib.components:
-    if component.name == comp.name:
-        print('Error: component "%s" already exists in the destination library.' % (comp.name))
-        sys.exit(1)
+comp = dst_lib.getComponentByName(component.name)
+if comp is not None:
+    print('Error: component "%s" already exists in the destination library.' % (component.name))
+    sys.exit(1)
 
 # append component to destination and save
 dst_lib.addComponent(component)
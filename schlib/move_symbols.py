@@ -198,9 +198,12 @@ for src_lib in src_libs:
 
         out_lib = output_lib(copy_lib)
 
-        for cmp in lib.components:
-            out_lib.addComponent(cmp)
-            allocated_symbols += 1
+        conflicts = out_lib.addComponents(lib.components)
+        allocated_symbols += len(lib.components) - len(conflicts)
+
+        for cmp in conflicts:
+            print("'{cmp}' is already in library '{lib}' - not copied".format(cmp=cmp.name, lib=copy_lib))
+            unallocated_symbols.append(lib_name + ' : ' + cmp.name)
 
         # Skip any further checks
         continue
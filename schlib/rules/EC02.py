@@ -27,19 +27,19 @@ class Rule(KLCRule):
         if len(self.component.draw['rectangles']) != 1:
             return False
 
-        top = max(int(self.component.draw['rectangles'][0]['starty']), int(self.component.draw['rectangles'][0]['endy']))
-        bottom = min(int(self.component.draw['rectangles'][0]['starty']), int(self.component.draw['rectangles'][0]['endy']))
+        top = max(self.component.draw['rectangles'][0].starty, self.component.draw['rectangles'][0].endy)
+        bottom = min(self.component.draw['rectangles'][0].starty, self.component.draw['rectangles'][0].endy)
 
         # reference checking
 
         # if there is no pins in the top, the recommended position to ref is at top-center, horizontally centered
-        if len(self.component.filterPins(direction='D')) == 0:
+        if len(self.analysis.pinsByDirection('D')) == 0:
             self.recommended_ref_pos = {'posx': 0, 'posy': (top + 125)}
             self.recommended_ref_alignment = 'C'
 
         # otherwise, the recommended is put it before the first pin x position, right-aligned
         else:
-            x = min([int(i['posx']) for i in self.component.filterPins(direction='D')]) - 100
+            x = min([i.posx for i in self.analysis.pinsByDirection('D')]) - 100
             self.recommended_ref_pos = {'posx': x, 'posy': (top + 125)}
             self.recommended_ref_alignment = 'R'
 
@@ -58,13 +58,13 @@ class Rule(KLCRule):
         # name checking
 
         # if there is no pins in the top, the recommended position to name is at top-center, horizontally centered
-        if len(self.component.filterPins(direction='D')) == 0:
+        if len(self.analysis.pinsByDirection('D')) == 0:
             self.recommended_name_pos = {'posx': 0, 'posy': (top + 50)}
             self.recommended_name_alignment = 'C'
 
         # otherwise, the recommended is put it before the first pin x position, right-aligned
         else:
-            x = min([int(i['posx']) for i in self.component.filterPins(direction='D')]) - 100
+            x = min([i.posx for i in self.analysis.pinsByDirection('D')]) - 100
             self.recommended_name_pos = {'posx': x, 'posy': (top + 50)}
             self.recommended_name_alignment = 'R'
 
@@ -80,13 +80,13 @@ class Rule(KLCRule):
         # footprint checking
 
         # if there is no pins in the bottom, the recommended position to footprint is at bottom-center, horizontally centered
-        if len(self.component.filterPins(direction='U')) == 0:
+        if len(self.analysis.pinsByDirection('U')) == 0:
             self.recommended_fp_pos = {'posx': 0, 'posy': (bottom - 50)}
             self.recommended_fp_alignment = 'C'
 
         # otherwise, the recommended is put it after the last pin x position, left-aligned
         else:
-            x = max([int(i['posx']) for i in self.component.filterPins(direction='U')]) + 50
+            x = max([i.posx for i in self.analysis.pinsByDirection('U')]) + 50
             self.recommended_fp_pos = {'posx': x, 'posy': (bottom - 50)}
             self.recommended_fp_alignment = 'L'
 
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from rules.rule import *
+from footprint_index import getFootprintIndex
+
+
+class Rule(KLCRule):
+    """
+    Create the methods check and fix to use with the kicad lib files.
+    """
+
+    # filters matching more footprints are reported as too generic
+    MAX_MATCHES = 1000
+
+    def __init__(self, component):
+        super(Rule, self).__init__(component, 'Footprint filters match existing footprints')
+
+    def check(self):
+        """
+        Proceeds the checking of the rule, only if the footprint libraries
+        are given (--footprints)
+        """
+        if not self.footprints_dir or not os.path.isdir(self.footprints_dir):
+            return False
+
+        matcher = getFootprintIndex(self.footprints_dir).getFilterMatcher()
+
+        for filt in self.component.fplist:
+            n_matches = len(matcher.match(filt))
+
+            if n_matches == 0:
+                self.warning("Footprint filter '{fil}' does not match any footprint".format(fil=filt))
+            elif n_matches > self.MAX_MATCHES:
+                self.warning("Footprint filter '{fil}' matches {n} footprints".format(fil=filt, n=n_matches))
+                self.warningExtra("a filter should only match the footprints suitable for the symbol")
+
+        # only warnings, the footprint libraries given may not be complete
+        return False
+
+    def fix(self):
+        """
+        Proceeds the fixing of the rule, if possible.
+        """
+        self.info("FIX: not supported")
@@ -24,24 +24,21 @@ class Rule(KLCRule):
         for unit in range(1, unit_count+1):
             # If there is only a single filled rectangle, we assume that it is the
             # main symbol outline.
-            drawing = self.component.draw
-            filled_rects = [rect for rect in drawing['rectangles']
-                            if ((not units_locked) or (int(rect['unit']) == unit)) and (rect['fill'] == 'f')]
+            filled_rects = self.analysis.filledRectangles(unit if units_locked else None)
             if len(filled_rects) == 1:
                 # We now find it's center
                 rect = filled_rects[0]
-                x = (int(rect['startx']) + int(rect['endx'])) // 2
-                y = (int(rect['starty']) + int(rect['endy'])) // 2
+                x = (rect.startx + rect.endx) // 2
+                y = (rect.starty + rect.endy) // 2
             else:
-                pins = [pin for pin in self.component.pins
-                        if (not units_locked) or (int(pin['unit']) == unit)]
+                pins = self.analysis.pinsByUnit(unit) if units_locked else self.component.pins
 
                 # No pins? Ignore check.
                 # This can be improved to include graphical items too...
                 if len(pins) == 0:
                     continue
-                x_pos = [int(pin['posx']) for pin in pins]
-                y_pos = [int(pin['posy']) for pin in pins]
+                x_pos = [pin.posx for pin in pins]
+                y_pos = [pin.posy for pin in pins]
                 x_min = min(x_pos)
                 x_max = max(x_pos)
                 y_min = min(y_pos)
@@ -40,8 +40,8 @@ class Rule(KLCRule):
         """
 
         for pin in self.component.pins:
-            name_text_size = int(pin['name_text_size'])
-            num_text_size = int(pin['num_text_size'])
+            name_text_size = pin.name_text_size
+            num_text_size = pin.num_text_size
 
             if (name_text_size < 20) or (name_text_size > 50) or (num_text_size < 20) or (num_text_size > 50):
                 self.violating_pins.append(pin)
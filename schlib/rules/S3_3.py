@@ -27,7 +27,7 @@ class Rule(KLCRule):
         if self.n_rectangles != 1:
             return False
 
-        if self.component.isSmallComponentHeuristics():
+        if self.analysis.isSmallComponent():
             if (self.component.draw['rectangles'][0]['thickness'] != '10'):
                 self.warning("Component outline is thickness {0}mil, recommended is {1}mil for standard symbol".format(self.component.draw['rectangles'][0]['thickness'], 10))
                 self.warningExtra("exceptions are allowed for small symbols like resistor, transistor, ...")
@@ -39,7 +39,7 @@ class Rule(KLCRule):
 
         if (self.component.draw['rectangles'][0]['fill'] != 'f'):
             self.warning("Component background is filled with {0} color, recommended is filling with {1} color".format(backgroundFillToStr(self.component.draw['rectangles'][0]['fill']), backgroundFillToStr('f')))
-            if self.component.isSmallComponentHeuristics():
+            if self.analysis.isSmallComponent():
                 self.warningExtra("exceptions are allowed for small symbols like resistor, transistor, ...")
             rectangle_need_fix = True
 
@@ -14,8 +14,8 @@ class Rule(KLCRule):
         self.violating_pins = []
         err = False
         for pin in self.component.pins:
-            posx = int(pin['posx'])
-            posy = int(pin['posy'])
+            posx = pin.posx
+            posy = pin.posy
             if (posx % gridspacing) != 0 or (posy % gridspacing) != 0:
                 self.violating_pins.append(pin)
                 if not err:
@@ -26,34 +26,13 @@ class Rule(KLCRule):
         return len(self.violating_pins) > 0
 
     def checkDuplicatePins(self):
-        # List of lists of pins
-        pin_lists = []
-
         # look for duplicate pin numbers
         # For a pin to be considered a duplicate, it must have:
         # - The same number
         # - Be in the same unit
         # - Be in the same "convert"
 
-        keys = ['num', 'unit', 'convert']
-
-        for pin in self.component.pins:
-
-            found = False
-
-            for i, pin_list in enumerate(pin_lists):
-
-                # Compare against first item
-                p_test = pin_list[0]
-
-                # Test each key
-                if all([pin[k] == p_test[k] for k in keys]):
-                    found = True
-                    pin_lists[i].append(pin)
-                    break
-
-            if not found:
-                pin_lists.append([pin])
+        pin_lists = self.analysis.duplicatePins()
 
         duplicate = False
 
@@ -72,7 +51,7 @@ class Rule(KLCRule):
         self.violating_pins = []
 
         for pin in self.component.pins:
-            length = int(pin['length'])
+            length = pin.length
 
             err = False
 
@@ -107,7 +86,7 @@ class Rule(KLCRule):
         pingrid = 100
         errorPinLength = 49
         warningPinLength = 99
-        if self.component.isSmallComponentHeuristics():
+        if self.analysis.isSmallComponent():
             pingrid = 50
             errorPinLength = 24
             warningPinLength = 49
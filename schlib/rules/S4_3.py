@@ -24,8 +24,8 @@ class Rule(KLCRule):
 
         # WHY are pins flipped vertically? Mega sad face :(
         return "Pinstack @ ({x},{y}){u}".format(
-            x=int(stack['x']),
-            y=-1 * int(stack['y']),
+            x=stack['x'],
+            y=-1 * stack['y'],
             u=unit_str)
 
     def pinStr(self, pin):
@@ -46,32 +46,11 @@ class Rule(KLCRule):
 
         pin_locations = []
 
-        for pin in self.component.pins:
-
-            # To be "identical", all following properties much be the same
-
-            pinx = pin['posx']     # x coordinate
-            piny = pin['posy']     # y coordinate
-            pinu = pin['unit']     # unit (for multi-unit parts)
-            pinc = pin['convert']  # convert (de morgan)
-
-            dupe = False
-
-            for loc in pin_locations:
-
-                locx = loc['x']
-                locy = loc['y']
-                locu = loc['u']
-                locc = loc['c']
-
-                if pinx == locx and piny == locy and pinu == locu and pinc == locc:
-                    loc['pins'].append(pin)
-                    dupe = True
-
-            if not dupe:
-                new_loc = {'x': pinx, 'y': piny, 'u': pinu, 'c': pinc}
-                new_loc['pins'] = [pin]
-                pin_locations.append(new_loc)
+        # To be "identical", the pins must have the same position, unit (for
+        # multi-unit parts) and convert (de morgan)
+        for pins in self.analysis.pinStacks():
+            pin = pins[0]
+            pin_locations.append({'x': pin.posx, 'y': pin.posy, 'u': pin['unit'], 'c': pin['convert'], 'pins': pins})
 
         err = False
 
@@ -100,7 +79,7 @@ class Rule(KLCRule):
                         self.error("NC {pin} @ ({x},{y})is stacked on other pins".format(
                             pin=self.pinStr(pin),
                             x=pin['posx'],
-                            y=-1*int(pin['posy'])))
+                            y=-1*pin.posy))
                         err = True
                         self.NC_stacked = True
 
@@ -108,7 +87,7 @@ class Rule(KLCRule):
                 if len(pin_nums) < len(loc['pins']):
                     self.error("Duplicate pins @ ({x},{y})".format(
                         x=loc['x'],
-                        y=-1 * int(loc['y'])))
+                        y=-1 * loc['y']))
                     err = True
                     for pin in loc['pins']:
                         self.errorExtra(self.pinStr(pin))
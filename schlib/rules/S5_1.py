@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from rules.rule import *
+from footprint_index import getFootprintIndex
 import fnmatch
 
 
@@ -62,18 +63,14 @@ class Rule(KLCRule):
                     if not fail:
                         if self.footprints_dir and os.path.exists(self.footprints_dir) and os.path.isdir(self.footprints_dir):
 
-                            fp_libs = [x.replace('.pretty', '') for x in os.listdir(self.footprints_dir) if x.endswith('.pretty')]
+                            fp_index = getFootprintIndex(self.footprints_dir)
 
-                            if fp_dir not in fp_libs:
+                            if not fp_index.hasLibrary(fp_dir):
                                 self.error('Specified footprint library does not exist')
                                 self.errorExtra("Footprint library '{l}' was not found".format(l=fp_dir))
-                            else:
-                                pretty_dir = os.path.join(self.footprints_dir, fp_dir + ".pretty")
-                                fp_file = os.path.join(pretty_dir, fp_path + '.kicad_mod')
-
-                                if not os.path.exists(fp_file):
-                                    self.error("Specified footprint does not exist")
-                                    self.errorExtra("Footprint file {l}:{f} was not found".format(l=fp_dir, f=fp_path))
+                            elif not fp_index.hasFootprint(fp_dir, fp_path):
+                                self.error("Specified footprint does not exist")
+                                self.errorExtra("Footprint file {l}:{f} was not found".format(l=fp_dir, f=fp_path))
 
                     for filt in filters:
                         match1 = fnmatch.fnmatch(fp_path, filt)
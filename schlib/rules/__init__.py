@@ -22,4 +22,6 @@ __all__ = [
 
 "S7_1",
 "S7_2",
+
+"EC03",
 ]
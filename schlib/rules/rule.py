@@ -65,14 +65,94 @@ def pinString(pin, loc=True, unit=None, convert=None):
 
 
 def positionFormater(element):
-    if type(element) != type({}):
-        raise Exception("input type: ", type(element), "expected dictionary, ", element)
+    if not hasattr(element, 'keys'):
+        raise Exception("input type: ", type(element), "expected dictionary or drawing item, ", element)
     if(not {"posx", "posy"}.issubset(element.keys())):
         raise Exception("missing keys 'posx' and 'posy' in"+str(element))
     return "@ ({0}, {1})".format(element['posx'], element['posy'])
     # return "pos [{0},{1}]".format(element['posx'],element['posy'])
 
 
+class ComponentAnalysis(object):
+    """
+    Facts about a component which are used by several rules
+
+    Each fact is computed on first use and shared by all the rules checking
+    the component, the returned lists must not be changed. invalidate() must
+    be called after the component is changed (e.g. by a fix).
+    """
+
+    def __init__(self, component):
+        self.component = component
+        self._facts = {}
+
+    def invalidate(self):
+        self._facts = {}
+        self.component.invalidatePinIndexes()
+
+    def _fact(self, name, compute):
+        if name not in self._facts:
+            self._facts[name] = compute()
+
+        return self._facts[name]
+
+    def _pinsBy(self, key):
+        pins = {}
+        for pin in self.component.pins:
+            pins.setdefault(getattr(pin, key), []).append(pin)
+
+        return pins
+
+    # the pins with the given direction ('L', 'R', 'U' or 'D')
+    def pinsByDirection(self, direction):
+        return self._fact('pins_by_direction', lambda: self._pinsBy('direction')).get(direction, [])
+
+    # the pins of the given unit (int)
+    def pinsByUnit(self, unit):
+        return self._fact('pins_by_unit', lambda: self._pinsBy('unit')).get(unit, [])
+
+    # the filled rectangles, of the given unit (int) only if not None
+    def filledRectangles(self, unit=None):
+        rects = self._fact('filled_rectangles', lambda: [rect for rect in self.component.draw['rectangles'] if rect['fill'] == 'f'])
+
+        if unit is None:
+            return rects
+
+        return [rect for rect in rects if rect.unit == unit]
+
+    # the lists of pins at the same position of the same unit and convert
+    def pinStacks(self):
+        return self._fact('pin_stacks', self.component.getPinStacks)
+
+    # the lists of pins with the same number in the same unit and convert,
+    # in the order of their first pin
+    def duplicatePins(self):
+        return self._fact('duplicate_pins', self._duplicatePins)
+
+    def _duplicatePins(self):
+        pin_lists = []
+
+        # only the pins sharing a number have to be compared
+        for pins in self.component.getPinIndexes()['num'].values():
+            if len(pins) < 2:
+                continue
+
+            groups = {}
+            for pin in pins:
+                groups.setdefault((pin['unit'], pin['convert']), []).append(pin)
+
+            pin_lists += [group for group in groups.values() if len(group) > 1]
+
+        if len(pin_lists) > 1:
+            order = {id(pin): i for i, pin in enumerate(self.component.pins)}
+            pin_lists.sort(key=lambda pin_list: order[id(pin_list[0])])
+
+        return pin_lists
+
+    def isSmallComponent(self):
+        return self._fact('small_component', self.component.isSmallComponentHeuristics)
+
+
 class KLCRule(KLCRuleBase):
     """
     A base class to represent a KLC rule
@@ -85,3 +165,7 @@ class KLCRule(KLCRuleBase):
         KLCRuleBase.__init__(self, description)
 
         self.component = component
+
+        # replaced by the analysis shared by all the rules when checking a
+        # library
+        self.analysis = ComponentAnalysis(component)
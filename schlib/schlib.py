@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
 
-import sys, shlex
+import copy
+import sys
 import os.path
 from collections import OrderedDict
 import hashlib
 
+common = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'common'))
+
+if not common in sys.path:
+    sys.path.append(common)
+
+from eeschema import splitLine
+
 class Documentation(object):
     """
     A class to parse documentation files (dcm) of Schematic Libraries Files Format of the KiCad
@@ -54,10 +62,10 @@ class Documentation(object):
         name = None
         f.seek(0)
 
-        checksum_data = ''
+        md5 = hashlib.md5()
 
-        for line in f.readlines():
-            checksum_data += line.strip()
+        for line in f:
+            md5.update(line.strip().encode('utf-8'))
             line = line.replace('\n', '')
             if line.startswith(Documentation.line_keys['start']):
                 name = line[5:].strip()
@@ -75,11 +83,6 @@ class Documentation(object):
             #FIXME: we do not handle comments except separators around components
         f.close()
 
-        try:
-            md5 = hashlib.md5(checksum_data.encode('utf-8'))
-        except UnicodeDecodeError:
-            md5 = hashlib.md5(checksum_data)
-
         self.checksum = md5.hexdigest()
 
         return True
@@ -116,6 +119,113 @@ class Documentation(object):
         if doc:#do not create empty records
             self.components[name]=doc
 
+class DrawItem(object):
+    """
+    A drawing item of a component (see the subclasses)
+
+    The properties are attributes, the integer ones are converted once when
+    the item is read. They can also be read and set as str like the keys of
+    a dict (item['posx']), which gives back the text of the library file.
+    """
+    __slots__ = ('_text',)
+    _KEYS = ()
+    _INT_KEYS = frozenset()
+
+    def __init__(self, values):
+        # same as setting each item, inlined as this is run for every line
+        text = None
+        int_keys = self._INT_KEYS
+
+        for key, value in zip(self._KEYS, values):
+            if key in int_keys:
+                try:
+                    number = int(value)
+                except ValueError:
+                    pass
+                else:
+                    if str(number) != value:
+                        if text is None:
+                            text = {}
+                        text[key] = (number, value)
+                    value = number
+
+            setattr(self, key, value)
+
+        self._text = text
+
+    def __getitem__(self, key):
+        value = getattr(self, key)
+
+        if type(value) is int:
+            # the text of integers written differently by str(), e.g. '+5'
+            if self._text and key in self._text and self._text[key][0] == value:
+                return self._text[key][1]
+            return str(value)
+
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._INT_KEYS and isinstance(value, str):
+            try:
+                number = int(value)
+            except ValueError:
+                pass
+            else:
+                if str(number) != value:
+                    if self._text is None:
+                        self._text = {}
+                    self._text[key] = (number, value)
+                value = number
+
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def keys(self):
+        return list(self._KEYS)
+
+    def items(self):
+        return [(key, self[key]) for key in self._KEYS]
+
+    def get(self, key, default=None):
+        return self[key] if key in self._KEYS else default
+
+    def __repr__(self):
+        return '{cls}({items})'.format(cls=type(self).__name__, items=dict(self.items()))
+
+class Arc(DrawItem):
+    _KEYS = ('posx','posy','radius','start_angle','end_angle','unit','convert','thickness','fill','startx','starty','endx','endy')
+    _INT_KEYS = frozenset(('posx','posy','radius','start_angle','end_angle','unit','convert','thickness','startx','starty','endx','endy'))
+    __slots__ = _KEYS
+
+class Circle(DrawItem):
+    _KEYS = ('posx','posy','radius','unit','convert','thickness','fill')
+    _INT_KEYS = frozenset(('posx','posy','radius','unit','convert','thickness'))
+    __slots__ = _KEYS
+
+class Polyline(DrawItem):
+    # the points are kept as a list of str
+    _KEYS = ('point_count','unit','convert','thickness','points','fill')
+    _INT_KEYS = frozenset(('point_count','unit','convert','thickness'))
+    __slots__ = _KEYS
+
+class Rectangle(DrawItem):
+    _KEYS = ('startx','starty','endx','endy','unit','convert','thickness','fill')
+    _INT_KEYS = frozenset(('startx','starty','endx','endy','unit','convert','thickness'))
+    __slots__ = _KEYS
+
+class Text(DrawItem):
+    _KEYS = ('direction','posx','posy','text_size','text_type','unit','convert','text','italic','bold','hjustify','vjustify')
+    _INT_KEYS = frozenset(('direction','posx','posy','text_size','text_type','unit','convert'))
+    __slots__ = _KEYS
+
+class Pin(DrawItem):
+    # the number is not an integer (e.g. 'A1' for BGAs)
+    _KEYS = ('name','num','posx','posy','length','direction','num_text_size','name_text_size','unit','convert','electrical_type','pin_type')
+    _INT_KEYS = frozenset(('posx','posy','length','num_text_size','name_text_size','unit','convert'))
+    __slots__ = _KEYS
+
 class Component(object):
     """
     A class to parse components of Schematic Libraries Files Format of the KiCad
@@ -124,40 +234,77 @@ class Component(object):
     _DEF_KEYS = ['name','reference','unused','text_offset','draw_pinnumber','draw_pinname','unit_count','units_locked','option_flag']
     _F0_KEYS = ['reference','posx','posy','text_size','text_orient','visibility','htext_justify','vtext_justify']
     _FN_KEYS = ['name','posx','posy','text_size','text_orient','visibility','htext_justify','vtext_justify','fieldname']
-    _ARC_KEYS = ['posx','posy','radius','start_angle','end_angle','unit','convert','thickness','fill','startx','starty','endx','endy']
-    _CIRCLE_KEYS = ['posx','posy','radius','unit','convert','thickness','fill']
-    _POLY_KEYS = ['point_count','unit','convert','thickness','points','fill']
-    _RECT_KEYS = ['startx','starty','endx','endy','unit','convert','thickness','fill']
-    _TEXT_KEYS = ['direction','posx','posy','text_size','text_type','unit','convert','text', 'italic', 'bold', 'hjustify', 'vjustify']
-    _PIN_KEYS = ['name','num','posx','posy','length','direction','num_text_size','name_text_size','unit','convert','electrical_type','pin_type']
+    _ARC_KEYS = list(Arc._KEYS)
+    _CIRCLE_KEYS = list(Circle._KEYS)
+    _POLY_KEYS = list(Polyline._KEYS)
+    _RECT_KEYS = list(Rectangle._KEYS)
+    _TEXT_KEYS = list(Text._KEYS)
+    _PIN_KEYS = list(Pin._KEYS)
 
     _DRAW_KEYS = {'A':_ARC_KEYS, 'C':_CIRCLE_KEYS, 'P':_POLY_KEYS, 'S':_RECT_KEYS, 'T':_TEXT_KEYS, 'X':_PIN_KEYS}
     # _DRAW_ELEMS = {'arcs':'A', 'circles':'C', 'polylines':'P', 'rectangles':'S', 'texts':'T', 'pins':'X'}
 
     _KEYS = {'DEF':_DEF_KEYS, 'F0':_F0_KEYS, 'F':_FN_KEYS,
              'A':_ARC_KEYS, 'C':_CIRCLE_KEYS, 'P':_POLY_KEYS, 'S':_RECT_KEYS, 'T':_TEXT_KEYS, 'X':_PIN_KEYS}
+    # attributes which are parsed from the lines of the component on first access
+    _LAZY_ATTRS = ('definition', 'fields', 'draw', 'drawOrdered', 'fplist', 'pins')
+
     def __init__(self, data, comments, filename, documentation):
         self.comments = comments
-        self.fplist = []
         self.aliases = OrderedDict()
         self.lib_filename = filename
         self.dcm_filename = documentation.filename
+
+        # the DEF..ENDDEF lines are only scanned for the name, aliases and
+        # checksum here, everything else is parsed when it is first used
+        self._data = data
+        self._parsed = False
+        self._pin_indexes = None
+
+        md5 = hashlib.md5()
+
+        for line in data:
+            md5.update(line.strip().encode('utf-8'))
+
+            if line.startswith('DEF') or line.startswith('ALIAS'):
+                line = splitLine(line.replace('\n', ''))
+
+                if line[0] == 'DEF':
+                    values = line[1:] + ['', '']
+                    self.name = values[0]
+                    self.reference = values[1]
+
+                elif line[0] == 'ALIAS':
+                    for alias in line[1:]:
+                        self.aliases[alias]=self.getDocumentation(documentation,alias)
+
+        self._aliases = list(self.aliases.keys())
+
+        self.checksum = md5.hexdigest()
+
+        # get documentation
+        self.documentation = self.getDocumentation(documentation,self.name)
+
+    def __getattr__(self, name):
+        # only called for attributes which are not set yet
+        if name not in Component._LAZY_ATTRS or self._parsed:
+            raise AttributeError("'Component' object has no attribute '{name}'".format(name=name))
+
+        self.__parse()
+        return getattr(self, name)
+
+    def __parse(self):
+        self._parsed = True
+        self.fplist = []
         building_fplist = False
         building_draw = False
         building_fields = False
 
-        checksum_data = ''
-
         self.resetDraw()
 
-        for line in data:
-            checksum_data += line.strip()
+        for line in self._data:
             line = line.replace('\n', '')
-            s = shlex.shlex(line)
-            s.whitespace_split = True
-            s.commenters = ''
-            s.quotes = '"'
-            line = list(s)
+            line = splitLine(line)
 
             if len(line) == 0:
                 continue
@@ -171,8 +318,7 @@ class Component(object):
                 self.definition = dict(zip(self._DEF_KEYS,values))
 
             elif line[0] == 'ALIAS':
-                for alias in line[1:]:
-                    self.aliases[alias]=self.getDocumentation(documentation,alias)
+                continue # read with the name
 
             elif line[0] == '$FPLIST':
                 building_fields = False
@@ -196,10 +342,10 @@ class Component(object):
 
                 elif building_draw:
                     if line[0] == 'A':
-                        self.draw['arcs'].append(dict(zip(self._ARC_KEYS,values)))
+                        self.draw['arcs'].append(Arc(values))
                         self.drawOrdered.append(['A',self.draw['arcs'][-1]])
                     if line[0] == 'C':
-                        self.draw['circles'].append(dict(zip(self._CIRCLE_KEYS,values)))
+                        self.draw['circles'].append(Circle(values))
                         self.drawOrdered.append(['C',self.draw['circles'][-1]])
                     if line[0] == 'P':#mixing X an Y points into 1 list in not handy
                         n_points = int(line[1])
@@ -209,16 +355,16 @@ class Component(object):
                             values += [line[-1]]
                         else:
                             values += ['']
-                        self.draw['polylines'].append(dict(zip(self._POLY_KEYS,values)))
+                        self.draw['polylines'].append(Polyline(values))
                         self.drawOrdered.append(['P',self.draw['polylines'][-1]])
                     if line[0] == 'S':
-                        self.draw['rectangles'].append(dict(zip(self._RECT_KEYS,values)))
+                        self.draw['rectangles'].append(Rectangle(values))
                         self.drawOrdered.append(['S',self.draw['rectangles'][-1]])
                     if line[0] == 'T':
-                        self.draw['texts'].append(dict(zip(self._TEXT_KEYS,values)))
+                        self.draw['texts'].append(Text(values))
                         self.drawOrdered.append(['T',self.draw['texts'][-1]])
                     if line[0] == 'X':
-                        self.draw['pins'].append(dict(zip(self._PIN_KEYS,values)))
+                        self.draw['pins'].append(Pin(values))
                         self.drawOrdered.append(['X',self.draw['pins'][-1]])
 
                 elif building_fields:
@@ -230,20 +376,156 @@ class Component(object):
                         values = line[1:] + ['' for n in range(len(self._FN_KEYS) - len(line[1:]))]
                         self.fields.append(dict(zip(self._FN_KEYS,values)))
 
-        #perform checksum calculation
-        try:
-            md5 = hashlib.md5(checksum_data.encode('utf-8'))
-        except UnicodeDecodeError:
-            md5 = hashlib.md5(checksum_data)
-        self.checksum = md5.hexdigest()
-
         # define some shortcuts
-        self.name = self.definition['name']
-        self.reference = self.definition['reference']
         self.pins = self.draw['pins']
 
-        # get documentation
-        self.documentation = self.getDocumentation(documentation,self.name)
+    # the DEF..ENDDEF lines as read from the library, None once the component
+    # is parsed or its aliases are changed as it may differ from them then
+    def getRawData(self):
+        if self._parsed or list(self.aliases.keys()) != self._aliases:
+            return None
+
+        return self._data
+
+    # the DEF..ENDDEF lines of the component, as written to a library
+    def getLines(self):
+        # components which were not changed are written as they were read
+        raw_data = self.getRawData()
+        if raw_data is not None:
+            return raw_data
+
+        return self._formatLines()
+
+    # the lines of the component formatted from its parsed fields
+    def _formatLines(self):
+        to_write = []
+
+        # DEF
+        line = 'DEF '
+        for key in Component._DEF_KEYS:
+            line += self.definition[key] + ' '
+
+        line = line.rstrip() + '\n'
+        to_write.append(line)
+
+        # FIELDS
+        line = 'F'
+        for i, f in enumerate(self.fields):
+            line = "F{n} ".format(n=i)
+
+            if i == 0:
+                keys_list = Component._F0_KEYS
+            else:
+                keys_list = Component._FN_KEYS
+
+            for k, key in enumerate(keys_list):
+                key_val = self.fields[i][key]
+
+                if k == 0 and not key_val.startswith('"'):
+                    key_val = '"' + key_val + '"'
+
+                line += key_val + ' '
+
+            line = line.rstrip() + '\n'
+            to_write.append(line)
+
+        # ALIAS
+        if len(self.aliases) > 0:
+            line = 'ALIAS '
+            for alias in self.aliases.keys():
+                line += alias + ' '
+
+            line = line.rstrip() + '\n'
+            to_write.append(line)
+
+        # $FPLIST
+        if len(self.fplist) > 0:
+            to_write.append('$FPLIST\n')
+            for fp in self.fplist:
+                to_write.append(' ' + fp + '\n')
+
+        # $ENDFPLIST
+            to_write.append('$ENDFPLIST\n')
+
+        # DRAW
+        to_write.append('DRAW\n')
+        for elem in self.drawOrdered:
+            item=elem[1]
+            keys_list = Component._DRAW_KEYS[elem[0]]# 'A' -> keys of all properties of arc
+            line = elem[0] + ' '# 'arcs' -> 'A'
+            for k in keys_list:
+                if k == 'points':
+                    for i in item['points']:
+                        line += '{0} '.format(i)
+                else:
+                    line += item[k] + ' '
+
+            line = line.rstrip() + '\n'
+            to_write.append(line)
+
+        # ENDDRAW
+        to_write.append('ENDDRAW\n')
+
+        # ENDDEF
+        to_write.append('ENDDEF\n')
+
+        return to_write
+
+    def getCanonicalHash(self):
+        """
+        Return a hash of the content of the component (sha1 hex digest) which
+        does not change when the library is only reformatted or reordered
+
+        The lines of the component are formatted from its parsed fields, so
+        the hash is the same whether the component was already parsed or not,
+        and split in fields, so the whitespace between fields does not matter
+        (it does inside quoted texts). The aliases, the footprint filters and the draw items are
+        sorted. The documentation of the component and of its aliases from
+        the .dcm file is part of the hash, with its whitespace collapsed.
+        Comments are not part of the hash.
+        """
+        header = []
+        fplist = []
+        draw = []
+
+        # an unparsed component is parsed in a copy, so that it is still
+        # saved as it was read
+        component = self if self._parsed else copy.copy(self)
+
+        lines = header
+        for line in component._formatLines():
+            fields = splitLine(line.replace('\n', ''))
+
+            if len(fields) == 0:
+                continue
+
+            if fields[0] == 'ALIAS':
+                fields = ['ALIAS'] + sorted(fields[1:])
+
+            if fields[0] in ('$ENDFPLIST', 'ENDDRAW'):
+                lines = header
+            elif fields[0] == '$FPLIST':
+                lines = fplist
+            elif fields[0] == 'DRAW':
+                lines = draw
+            elif fields[0] != 'ENDDEF':
+                lines.append(' '.join(fields))
+
+        lines = header + ['$FPLIST'] + sorted(fplist) + ['DRAW'] + sorted(draw)
+
+        for name in [self.name] + sorted(self.aliases.keys()):
+            doc = self.documentation if name == self.name else self.aliases[name]
+
+            lines.append(Documentation.line_keys['start'] + name)
+            for key in ('description', 'keywords', 'datasheet'):
+                if doc.get(key) is not None:
+                    lines.append(Documentation.line_keys[key] + ' '.join(doc[key].split()))
+
+        sha1 = hashlib.sha1()
+        for line in lines:
+            sha1.update((line + '\n').encode('utf-8'))
+
+        return sha1.hexdigest()
 
     def resetDraw(self):
         self.draw = {
@@ -264,22 +546,53 @@ class Component(object):
         except KeyError:
             return {}
 
-    def getPinsByName(self, name):
-        pins = []
-        for pin in self.pins:
-            if pin['name'] == name:
-                pins.append(pin)
+    # the pins by number, by name, by (unit, convert) and by position
+    # (posx, posy, unit, convert), each key maps to its pins in drawing order
+    # the indexes are built on first use and again when pins are added or
+    # removed, invalidatePinIndexes() must be called after changing one of
+    # these properties of a pin
+    def getPinIndexes(self):
+        if self._pin_indexes is None or self._pin_indexes[0] is not self.pins or self._pin_indexes[1] != len(self.pins):
+            indexes = {'num': {}, 'name': {}, 'unit': {}, 'position': {}}
 
-        return pins
+            for pin in self.pins:
+                indexes['num'].setdefault(pin['num'], []).append(pin)
+                indexes['name'].setdefault(pin['name'], []).append(pin)
+                indexes['unit'].setdefault((pin['unit'], pin['convert']), []).append(pin)
+                indexes['position'].setdefault((pin['posx'], pin['posy'], pin['unit'], pin['convert']), []).append(pin)
+
+            self._pin_indexes = (self.pins, len(self.pins), indexes)
+
+        return self._pin_indexes[2]
+
+    def invalidatePinIndexes(self):
+        self._pin_indexes = None
+
+    def getPinsByName(self, name):
+        return list(self.getPinIndexes()['name'].get(name, []))
 
     def getPinByNumber(self, num):
-        for pin in self.draw['pins']:
-            if pin['num'] == str(num):
-                return pin
+        pins = self.getPinIndexes()['num'].get(str(num))
+        if pins:
+            return pins[0]
 
         return None
 
+    def getPinsByNumber(self, num):
+        return list(self.getPinIndexes()['num'].get(str(num), []))
+
+    def getPinsByUnit(self, unit, convert):
+        return list(self.getPinIndexes()['unit'].get((str(unit), str(convert)), []))
+
+    # the pins at the same position of the same unit and convert, as lists in
+    # the order of their first pin
+    def getPinStacks(self):
+        return [list(pins) for pins in self.getPinIndexes()['position'].values()]
+
     def filterPins(self, name=None, direction=None, electrical_type=None):
+        if name and not direction and not electrical_type:
+            return self.getPinsByName(name)
+
         pins = []
 
         for pin in self.pins:
@@ -338,6 +651,11 @@ class SchLib(object):
         self.components = []
         self.validFile = False
 
+        # components by name and by alias, each name maps to the list of the
+        # components using it in library order
+        self._names = {}
+        self._aliases = {}
+
         self.checksum = ""
 
         self.documentation = Documentation(self.libToDcmFilename(self.filename), create)
@@ -358,7 +676,8 @@ class SchLib(object):
                 self.validFile = True
                 self.__parse()
 
-    def libToDcmFilename(self,filename):
+    @staticmethod
+    def libToDcmFilename(filename):
         dir_path = os.path.dirname(os.path.realpath(filename))
         filename = os.path.splitext(os.path.basename(filename))
         return os.path.join(dir_path, filename[0] + '.dcm')
@@ -366,29 +685,55 @@ class SchLib(object):
     def __parse(self):
         f = open(self.filename, 'r')
 
-        checksum_data = ""
-
         self.header = [f.readline()]
 
-        checksum_data += self.header[0]
+        md5 = hashlib.md5(self.header[0].encode('utf-8'))
 
         if self.header and not SchLib.line_keys['header'] in self.header[0]:
             sys.stderr.write("'{fn}' is not a KiCad Schematic Library File\n".format(fn=self.filename))
             return False
 
         self.header.append(f.readline())
+
+        lines = f.readlines()
+        f.close()
+
+        for line in lines:
+            md5.update(line.strip().encode('utf-8'))
+
+        for component_data, comments in SchLib.__readComponents(lines):
+            component = Component(component_data, comments, self.filename, self.documentation)
+            self.components.append(component)
+            self.__indexComponent(component)
+
+        self.checksum = md5.hexdigest()
+
+        return True
+
+    @staticmethod
+    def __readComponents(lines, predicate=None):
+        """
+        Yield the lines of each DEF..ENDDEF block with the comments above it
+
+        Blocks of components whose name is rejected by predicate are skipped
+        """
         building_component = False
+        skipping_component = False
 
         comments = []
-        for line in f.readlines():
-
-            checksum_data += line.strip()
+        for line in lines:
 
             if line.startswith('#'):
                 comments.append(line)
 
             elif line.startswith('DEF'):
+                if predicate and not predicate(splitLine(line)[1]):
+                    building_component = False
+                    skipping_component = True
+                    continue
+
                 building_component = True
+                skipping_component = False
                 component_data = []
                 component_data.append(line)
 
@@ -396,18 +741,56 @@ class SchLib(object):
                 component_data.append(line)
                 if line.startswith('ENDDEF'):
                     building_component = False
-                    self.components.append(Component(component_data, comments, self.filename, self.documentation))
+                    yield component_data, comments
                     comments = []
-        f.close()
 
-        #perform checksum calculation
-        try:
-            md5 = hashlib.md5(checksum_data.encode('utf-8'))
-        except UnicodeDecodeError:
-            md5 = hashlib.md5(checksum_data)
-        self.checksum = md5.hexdigest()
+            elif skipping_component and line.startswith('ENDDEF'):
+                skipping_component = False
+                comments = []
+
+    @staticmethod
+    def readComponentBlocks(filename):
+        """
+        Return the lines of the components of a library file as
+        (component_data, comments) tuples, without parsing them
+
+        Returns None when the file is not a library
+        """
+        if not os.path.isfile(filename):
+            return None
+
+        with open(filename, 'r') as f:
+            if not SchLib.line_keys['header'] in f.readline():
+                return None
+
+            f.readline()
+
+            return list(SchLib.__readComponents(f))
+
+    @staticmethod
+    def iter_components(filename, predicate=None):
+        """
+        Yield the components of a library file one by one, while the file is
+        read, instead of loading the whole library
+
+        predicate is called with the name of each component, the components
+        for which it returns False are not parsed
+        """
+        if not os.path.isfile(filename):
+            sys.stderr.write("Library file '{filename}' does not exist\n".format(filename=filename))
+            return
+
+        with open(filename, 'r') as f:
+            if not SchLib.line_keys['header'] in f.readline():
+                sys.stderr.write("'{fn}' is not a KiCad Schematic Library File\n".format(fn=filename))
+                return
 
-        return True
+            f.readline()
+
+            documentation = Documentation(SchLib.libToDcmFilename(filename))
+
+            for component_data, comments in SchLib.__readComponents(f, predicate):
+                yield Component(component_data, comments, filename, documentation)
 
     def validChecksum(self):
         if len(self.checksum) == 0:
@@ -425,13 +808,32 @@ class SchLib(object):
         return self.checksum == otherlib.checksum and self.documentation.checksum == otherlib.documentation.checksum
 
 
-    def getComponentByName(self, name):
-        for component in self.components:
-            if component.definition['name'] == name:
-                return component
+    def __indexComponent(self, component):
+        self._names.setdefault(component.name, []).append(component)
+        for alias in component.aliases.keys():
+            self._aliases.setdefault(alias, []).append(component)
+
+    def __unindexComponent(self, component):
+        for index, names in ((self._names, [component.name]), (self._aliases, component.aliases.keys())):
+            for name in names:
+                index[name].remove(component)
+                if len(index[name]) == 0:
+                    del index[name]
+
+    # the component with the given name, or having it as alias if no
+    # component has that name and aliases is True
+    def getComponentByName(self, name, aliases=True):
+        components = self._names.get(name)
+        if not components and aliases:
+            components = self._aliases.get(name)
+        if components:
+            return components[0]
 
         return None
 
+    # the names and aliases of the components
+    def getComponentNames(self):
+        return set(self._names) | set(self._aliases)
 
     def getComponentCount(self, unique=False):
         count = 0
@@ -447,21 +849,59 @@ class SchLib(object):
         return count
 
 
+    # remove the component with the given name (or alias) and its documentation
     def removeComponent(self, name):
         component = self.getComponentByName(name)
         for alias in component.aliases.keys():
             self.documentation.remove(alias)
-        self.documentation.remove(name)
+        self.documentation.remove(component.name)
         self.components.remove(component)
+        self.__unindexComponent(component)
         return component
 
     def addComponent(self, component):
-        if not component in self.components:
+        if not component in self._names.get(component.name, []):
             self.components.append(component)
+            self.__indexComponent(component)
             self.documentation.add(component.name, component.documentation)
             for alias in component.aliases.keys():
                 self.documentation.add(alias, component.aliases[alias])
 
+    # add the components whose name and aliases are not used in the library
+    # (nor by another of the added components), the components which are not
+    # added because of such a conflict are returned
+    def addComponents(self, components):
+        names = self.getComponentNames()
+        conflicts = []
+
+        for component in components:
+            component_names = [component.name] + list(component.aliases.keys())
+
+            if names.isdisjoint(component_names) and len(set(component_names)) == len(component_names):
+                names.update(component_names)
+                self.addComponent(component)
+            else:
+                conflicts.append(component)
+
+        return conflicts
+
+    # rename a component (not an alias), its value field and its
+    # documentation follow
+    def renameComponent(self, name, new_name):
+        component = self._names[name][0]
+        self.__unindexComponent(component)
+
+        if component.fields[1]['name'] in (component.name, '"' + component.name + '"'):
+            component.fields[1]['name'] = '"' + new_name + '"'
+
+        self.documentation.remove(component.name)
+        component.name = new_name
+        component.definition['name'] = new_name
+        self.documentation.add(new_name, component.documentation)
+
+        self.__indexComponent(component)
+        return component
+
     def save(self, filename=None):
         if not self.validFile: return False
 
@@ -480,74 +920,7 @@ class SchLib(object):
             # append the component comments
             to_write += component.comments
 
-            # DEF
-            line = 'DEF '
-            for key in Component._DEF_KEYS:
-                line += component.definition[key] + ' '
-
-            line = line.rstrip() + '\n'
-            to_write.append(line)
-
-            # FIELDS
-            line = 'F'
-            for i, f in enumerate(component.fields):
-                line = "F{n} ".format(n=i)
-
-                if i == 0:
-                    keys_list = Component._F0_KEYS
-                else:
-                    keys_list = Component._FN_KEYS
-
-                for k, key in enumerate(keys_list):
-                    key_val = component.fields[i][key]
-
-                    if k == 0 and not key_val.startswith('"'):
-                        key_val = '"' + key_val + '"'
-
-                    line += key_val + ' '
-
-                line = line.rstrip() + '\n'
-                to_write.append(line)
-
-            # ALIAS
-            if len(component.aliases) > 0:
-                line = 'ALIAS '
-                for alias in component.aliases.keys():
-                    line += alias + ' '
-
-                line = line.rstrip() + '\n'
-                to_write.append(line)
-
-            # $FPLIST
-            if len(component.fplist) > 0:
-                to_write.append('$FPLIST\n')
-                for fp in component.fplist:
-                    to_write.append(' ' + fp + '\n')
-
-            # $ENDFPLIST
-                to_write.append('$ENDFPLIST\n')
-
-            # DRAW
-            to_write.append('DRAW\n')
-            for elem in component.drawOrdered:
-                item=elem[1]
-                keys_list = Component._DRAW_KEYS[elem[0]]# 'A' -> keys of all properties of arc
-                line = elem[0] + ' '# 'arcs' -> 'A'
-                for k in keys_list:
-                    if k == 'points':
-                        for i in item['points']:
-                            line += '{0} '.format(i)
-                    else:
-                        line += item[k] + ' '
-
-                line = line.rstrip() + '\n'
-                to_write.append(line)
-
-            # ENDDRAW
-            to_write.append('ENDDRAW\n')
-
-            # ENDDEF
-            to_write.append('ENDDEF\n')
+            to_write += component.getLines()
 
         # insert the footer
         to_write.append('#\n')
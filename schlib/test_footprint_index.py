@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the footprint index and of the footprint filter matcher
+
+example of use: python -m unittest test_footprint_index
+"""
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from footprint_index import FootprintIndex, wildcardToRegex
+
+FOOTPRINTS = {
+    'Package_SO': [
+        'SOIC-8_3.9x4.9mm_P1.27mm',
+        'SOIC-14_3.9x8.7mm_P1.27mm',
+        'SOIC-16W_7.5x10.3mm_P1.27mm',
+        'SOIC-8-1EP_3.9x4.9mm_P1.27mm_EP2.29x3mm',
+        'TSSOP-8_4.4x3mm_P0.65mm',
+    ],
+    'Package_TO_SOT_SMD': [
+        'SOT-23',
+        'SOT-23-5',
+        'SOT-223-3_TabPin2',
+    ],
+    'Resistor_SMD': [
+        'R_0402_1005Metric',
+        'R_0603_1608Metric',
+        'R_Array_Convex_4x0603',
+    ],
+    'Connector_PinHeader_2.54mm': [
+        'PinHeader_1x02_P2.54mm_Vertical',
+        'PinHeader_1x03_P2.54mm_Vertical',
+        'PinHeader_1x10_P2.54mm_Vertical',
+    ],
+    'Test': [
+        'Pad[1]_Square',
+        'Pad1_Square',
+    ],
+}
+
+class FootprintFilterMatcherTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        for library, footprints in FOOTPRINTS.items():
+            os.mkdir(os.path.join(cls.dir, library + '.pretty'))
+            for footprint in footprints:
+                open(os.path.join(cls.dir, library + '.pretty', footprint + '.kicad_mod'), 'w').close()
+
+        cls.matcher = FootprintIndex(cls.dir).getFilterMatcher()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir)
+
+    def match(self, filt):
+        return sorted(self.matcher.match(filt))
+
+    def test_soic(self):
+        self.assertEqual(self.match('SOIC*3.9x4.9mm*P1.27mm*'), [
+            'Package_SO:SOIC-8-1EP_3.9x4.9mm_P1.27mm_EP2.29x3mm',
+            'Package_SO:SOIC-8_3.9x4.9mm_P1.27mm',
+        ])
+
+    def test_whole_name(self):
+        # a filter has to match the whole name
+        self.assertEqual(self.match('SOT?23'), ['Package_TO_SOT_SMD:SOT-23'])
+        self.assertEqual(self.match('SOT?23*'), [
+            'Package_TO_SOT_SMD:SOT-23',
+            'Package_TO_SOT_SMD:SOT-23-5',
+        ])
+        self.assertEqual(self.match('SOIC-8'), [])
+
+    def test_question_mark(self):
+        self.assertEqual(self.match('R_????_*'), [
+            'Resistor_SMD:R_0402_1005Metric',
+            'Resistor_SMD:R_0603_1608Metric',
+        ])
+
+    def test_leading_wildcard(self):
+        self.assertEqual(self.match('*_P1.27mm'), [
+            'Package_SO:SOIC-14_3.9x8.7mm_P1.27mm',
+            'Package_SO:SOIC-16W_7.5x10.3mm_P1.27mm',
+            'Package_SO:SOIC-8_3.9x4.9mm_P1.27mm',
+        ])
+        self.assertEqual(self.match('*0603*'), [
+            'Resistor_SMD:R_0603_1608Metric',
+            'Resistor_SMD:R_Array_Convex_4x0603',
+        ])
+        self.assertEqual(self.match('*'), sorted(
+            library + ':' + footprint for library, footprints in FOOTPRINTS.items() for footprint in footprints))
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.match('soic*3.9X4.9MM*p1.27mm*'), self.match('SOIC*3.9x4.9mm*P1.27mm*'))
+        self.assertEqual(self.match('*_p1.27MM'), self.match('*_P1.27mm'))
+        self.assertEqual(self.match('package_so:soic-8_*'), ['Package_SO:SOIC-8_3.9x4.9mm_P1.27mm'])
+
+    def test_library(self):
+        self.assertEqual(self.match('Connector*:PinHeader_1x0?_P2.54mm*'), [
+            'Connector_PinHeader_2.54mm:PinHeader_1x02_P2.54mm_Vertical',
+            'Connector_PinHeader_2.54mm:PinHeader_1x03_P2.54mm_Vertical',
+        ])
+        self.assertEqual(self.match('Package_SO:SOT-23'), [])
+
+    def test_brackets_are_literal(self):
+        self.assertEqual(self.match('Pad[1]*'), ['Test:Pad[1]_Square'])
+        self.assertEqual(self.match('Pad[12]_Square'), [])
+
+    def test_regex_characters_are_literal(self):
+        self.assertEqual(self.match('SOIC-8_3.9x4.9mm_P1.27mm'), ['Package_SO:SOIC-8_3.9x4.9mm_P1.27mm'])
+        self.assertEqual(self.match('SOIC-8_3?9x4?9mm_P1?27mm'), ['Package_SO:SOIC-8_3.9x4.9mm_P1.27mm'])
+        self.assertEqual(self.match('SOIC-8_3x9x4.9mm_P1.27mm'), [])
+        self.assertEqual(self.match('R_0402+*'), [])
+
+    def test_same_as_plain_matching(self):
+        # the narrowing of the candidates gives the same results as testing
+        # every footprint
+        names = [(library, footprint) for library, footprints in FOOTPRINTS.items() for footprint in footprints]
+        for filt in ['SOIC*', '*SOIC*', '*3.9x*', 'S*', '*mm', '?O*', '*P1.27mm*', '**', 'R_*0603*',
+                     '*:SOT*', 'Package*:*', '*_SMD:R*', 'Pad[1]*', '*[1]*', '*1]*']:
+            regex = wildcardToRegex(filt.lower())
+            expected = sorted(library + ':' + footprint for library, footprint in names
+                              if re.fullmatch(regex, (library + ':' + footprint if ':' in filt else footprint).lower()))
+            self.assertEqual(self.match(filt), expected, filt)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the SchLib and Component classes
+
+example of use: python -m unittest test_schlib
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+sys.path.insert(0, os.path.join(here, '..', 'common'))
+
+from schlib import SchLib
+
+# the value field (F1) is not quoted, it is when the component is saved
+# after being parsed
+LIBRARY = """EESchema-LIBRARY Version 2.3
+#encoding utf-8
+#
+# R
+#
+DEF R R 0 0 N Y 1 F N
+F0 "R" 80 0 50 V V C CNN
+F1 R 0 0 50 V V C CNN
+F2 "" -70 0 50 V I C CNN
+F3 "" 0 0 50 H I C CNN
+ALIAS R_Small
+$FPLIST
+ R_*
+$ENDFPLIST
+DRAW
+S -40 -100 40 100 0 1 10 N
+X ~ 1 0 150 50 D 50 50 1 1 P
+X ~ 2 0 -150 50 U 50 50 1 1 P
+ENDDRAW
+ENDDEF
+#
+#End Library
+"""
+
+DOCUMENTATION = """EESchema-DOCLIB  Version 2.0
+#
+$CMP R
+D Resistor
+K R res resistor
+$ENDCMP
+#
+#End Doc Library
+"""
+
+class LibraryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'Test.lib')
+        with open(self.filename, 'w') as f:
+            f.write(LIBRARY)
+        with open(os.path.join(self.dir, 'Test.dcm'), 'w') as f:
+            f.write(DOCUMENTATION)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+class CanonicalHashTest(LibraryTestCase):
+
+    def component(self):
+        return SchLib(self.filename).components[0]
+
+    def test_parsed_and_unparsed(self):
+        unparsed = self.component()
+        parsed = self.component()
+        parsed.fplist
+
+        self.assertEqual(unparsed.getCanonicalHash(), parsed.getCanonicalHash())
+
+    def test_hash_does_not_parse(self):
+        component = self.component()
+        component.getCanonicalHash()
+
+        self.assertEqual(component.getRawData(), component.getLines())
+        self.assertIn('F1 R 0 0 50 V V C CNN\n', component.getLines())
+
+    def test_changed_component(self):
+        component = self.component()
+        before = component.getCanonicalHash()
+
+        component.fplist.append('R_0603*')
+        self.assertNotEqual(component.getCanonicalHash(), before)
+
+class ComponentLookupTest(LibraryTestCase):
+
+    def test_name(self):
+        lib = SchLib(self.filename)
+
+        self.assertIs(lib.getComponentByName('R'), lib.components[0])
+        self.assertIs(lib.getComponentByName('R', aliases=False), lib.components[0])
+
+    def test_alias(self):
+        lib = SchLib(self.filename)
+
+        self.assertIs(lib.getComponentByName('R_Small'), lib.components[0])
+        self.assertIsNone(lib.getComponentByName('R_Small', aliases=False))
+
+    def test_unknown(self):
+        lib = SchLib(self.filename)
+
+        self.assertIsNone(lib.getComponentByName('C'))
+
+if __name__ == '__main__':
+    unittest.main()